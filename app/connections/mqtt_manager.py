@@ -0,0 +1,227 @@
+
+# mqtt_manager.py
+import os, threading, weakref, zlib
+from typing import Callable, Dict, List, Optional, Tuple
+from paho.mqtt import client as mqtt
+from pixkit_core import metrics
+
+
+def broker_from_env() -> Dict:
+    """Broker settings from MQTT_URL / MQTT_USER / MQTT_PASS (same parsing as before)."""
+    url = os.getenv("MQTT_URL", "mqtt://localhost:1883")
+    proto, rest = url.split("://", 1)
+    if ":" in rest:
+        host, port = rest.split(":")
+        port = int(port)
+    else:
+        host, port = rest, 1883
+    return {
+        "host": host,
+        "port": port,
+        "tls": proto == "mqtts",
+        "user": os.getenv("MQTT_USER", ""),
+        "password": os.getenv("MQTT_PASS", ""),
+    }
+
+
+class MqttConnectionManager:
+    """
+    Process-wide broker connection(s) shared by every PixkitMqttClient.
+    - pool_size paho clients (default 1); each topic filter lives on one of them (stable hash).
+    - subscribe()/unsubscribe() are reference counted: the broker sees one SUBSCRIBE per
+      filter no matter how many consumers want it, and UNSUBSCRIBE when the last one leaves.
+    - Consumer callbacks and listeners are held weakly (like services.pubsub): a client
+      dropped without disconnect() (e.g. a closed Streamlit session) stops receiving and
+      releases its subscriptions. Callers keep their callbacks alive (bound methods are fine).
+    - publish() uses the same stable topic hash, so one topic (e.g. a device's command topic)
+      always goes out on one connection and keeps MQTT's per-connection ordering.
+    - Each incoming message is handed once to every matching consumer callback.
+    - paho's background loop reconnects with backoff; on every (re)connect all live
+      filters are resubscribed and connection listeners are notified.
+    - There is deliberately no separate connection for critical commands: MQTT orders only
+      within one connection, and an emergency_stop must never be overtaken by a start or
+      set_controls published just before it.
+    """
+
+    def __init__(self, host: str, port: int = 1883, tls: bool = False, user: str = "", password: str = "",
+                 pool_size: int = 1, keepalive: int = 30):
+        self.host, self.port, self.keepalive = host, port, keepalive
+        self._lock = threading.RLock()
+        self._subs: Dict[str, List[Tuple[weakref.ref, int]]] = {}  # filter -> [(callback ref, qos)]
+        self._listeners: List[Tuple[weakref.ref, weakref.ref]] = []  # (on_connected, on_disconnected) refs
+        self._connected = [False] * max(1, pool_size)
+        self._started = False
+        self.clients = []
+        for i in range(max(1, pool_size)):
+            c = self._new_client(tls, user, password)
+            c.on_connect = self._make_on_connect(i)
+            c.on_disconnect = self._make_on_disconnect(i)
+            c.on_message = self._on_message
+            self.clients.append(c)
+
+    @staticmethod
+    def _new_client(tls: bool, user: str, password: str) -> mqtt.Client:
+        c = mqtt.Client()
+        if user:
+            c.username_pw_set(user, password)
+        if tls:
+            c.tls_set()
+        c.reconnect_delay_set(min_delay=1, max_delay=30)
+        return c
+
+    # Lifecycle
+    def start(self) -> None:
+        """Connect every pooled client (non-blocking, idempotent)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for c in self.clients:
+            c.connect_async(self.host, self.port, keepalive=self.keepalive)
+            c.loop_start()
+        metrics.gauge("mqtt.connections", len(self.clients))
+
+    def stop(self) -> None:
+        with self._lock:
+            self._started = False
+        for c in self.clients:
+            c.disconnect()
+            c.loop_stop()
+
+    @property
+    def connected(self) -> bool:
+        return all(self._connected)
+
+    def add_listener(self, on_connected: Callable, on_disconnected: Callable) -> None:
+        with self._lock:
+            self._listeners.append((_weak(on_connected), _weak(on_disconnected)))
+            up = self._started and self.connected
+        if up:
+            on_connected()
+
+    def remove_listener(self, on_connected: Callable, on_disconnected: Callable) -> None:
+        with self._lock:
+            for i, (up, down) in enumerate(self._listeners):
+                if up() == on_connected and down() == on_disconnected:
+                    del self._listeners[i]
+                    break
+
+    def _live_listeners(self) -> List[Tuple[Callable, Callable]]:
+        """Dereferenced listeners, pruning dead ones (caller holds the lock)."""
+        live = [(up(), down()) for up, down in self._listeners]
+        self._listeners = [l for l, (up, down) in zip(self._listeners, live) if up and down]
+        return [(up, down) for up, down in live if up and down]
+
+    # Subscriptions and publishes
+    def _client_for(self, topic: str) -> mqtt.Client:
+        return self.clients[zlib.crc32(topic.encode("utf-8")) % len(self.clients)]
+
+    def subscribe(self, topic_filter: str, callback: Callable, qos: int = 1) -> None:
+        with self._lock:
+            self._prune(topic_filter)
+            subs = self._subs.setdefault(topic_filter, [])
+            first = not subs
+            subs.append((_weak(callback), qos))
+            metrics.gauge("mqtt.subscriptions", len(self._subs))
+        if first:
+            self._client_for(topic_filter).subscribe(topic_filter, qos)
+
+    def unsubscribe(self, topic_filter: str, callback: Callable) -> None:
+        """Drop one registration of callback (one reference); UNSUBSCRIBE when none remain."""
+        with self._lock:
+            subs = self._subs.get(topic_filter, [])
+            for i, (ref, _) in enumerate(subs):
+                if ref() == callback:
+                    del subs[i]
+                    break
+            last = self._prune(topic_filter)
+        if last:
+            self._client_for(topic_filter).unsubscribe(topic_filter)
+
+    def _prune(self, topic_filter: str) -> bool:
+        """Drop dead callbacks of one filter; True if that emptied it (caller holds the lock)."""
+        subs = self._subs.get(topic_filter)
+        if subs is None:
+            return False
+        subs[:] = [s for s in subs if s[0]() is not None]
+        if subs:
+            return False
+        del self._subs[topic_filter]
+        metrics.gauge("mqtt.subscriptions", len(self._subs))
+        return True
+
+    def refcount(self, topic_filter: str) -> int:
+        with self._lock:
+            self._prune(topic_filter)
+            return len(self._subs.get(topic_filter, ()))
+
+    def publish(self, topic: str, payload, qos: int = 1, retain: bool = False):
+        return self._client_for(topic).publish(topic, payload, qos=qos, retain=retain)
+
+    # paho callbacks
+    def _make_on_connect(self, i: int):
+        def on_connect(client, userdata, flags, rc):
+            if rc != 0:
+                return
+            with self._lock:
+                self._connected[i] = True
+                for f in list(self._subs):
+                    self._prune(f)
+                mine = [(f, max(q for _, q in subs)) for f, subs in self._subs.items()
+                        if self._client_for(f) is client]
+                listeners = self._live_listeners() if self.connected else []
+            if mine:
+                client.subscribe(mine)  # resubscribe everything on (re)connect
+            metrics.incr("mqtt.connects")
+            for on_up, _ in listeners:
+                on_up()
+        return on_connect
+
+    def _make_on_disconnect(self, i: int):
+        def on_disconnect(client, userdata, rc):
+            with self._lock:
+                was_up = self.connected
+                self._connected[i] = False
+                listeners = self._live_listeners() if was_up else []
+            metrics.incr("mqtt.disconnects")
+            for _, on_down in listeners:
+                on_down()
+        return on_disconnect
+
+    def _on_message(self, client, userdata, msg):
+        targets, emptied = [], []
+        with self._lock:
+            for f in [f for f in self._subs if mqtt.topic_matches_sub(f, msg.topic)]:
+                targets.extend(cb for cb in (ref() for ref, _ in self._subs[f]) if cb is not None)
+                if self._prune(f):
+                    emptied.append(f)  # every consumer of this filter is gone
+        for f in emptied:
+            self._client_for(f).unsubscribe(f)
+        for cb in targets:
+            cb(msg)
+
+
+def _weak(callback: Callable) -> weakref.ref:
+    """Weak reference to a callback; bound methods need WeakMethod to track their instance."""
+    if hasattr(callback, "__func__"):
+        return weakref.WeakMethod(callback)
+    try:
+        return weakref.ref(callback)
+    except TypeError:  # builtins (e.g. print) cannot be weakly referenced; they never die anyway
+        return lambda: callback
+
+
+_managers: Dict[Tuple, MqttConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(pool_size: Optional[int] = None, **broker) -> MqttConnectionManager:
+    """Shared manager for a broker (defaults from env). One per process per broker settings."""
+    cfg = broker or broker_from_env()
+    pool_size = pool_size or int(os.getenv("MQTT_POOL_SIZE", "1"))
+    key = (cfg["host"], cfg["port"], cfg.get("tls", False), cfg.get("user", ""), pool_size)
+    with _managers_lock:
+        mgr = _managers.get(key)
+        if mgr is None:
+            mgr = _managers[key] = MqttConnectionManager(pool_size=pool_size, **cfg)
+        return mgr
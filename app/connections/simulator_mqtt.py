@@ -1,9 +1,17 @@
 
 # simulator_mqtt.py
-import os, json, time, random
+import os, sys, json, time, random
 from paho.mqtt import client as mqtt
 from dotenv import load_dotenv
 
+if not __package__:
+    # Run as a script (python connections/simulator_mqtt.py): make app/ importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pixkit_core import tracing
+from pixkit_core.events import CRITICAL, priority_for
+from pixkit_core.reporting import Reporter, ReportPolicy
+from pixkit_core.utils import now_iso
+
 load_dotenv()
 
 device_id = os.getenv("PIXKIT_DEVICE_ID", "pixkit-car-001")
@@ -18,6 +26,10 @@ proto, rest = url.split("://", 1)
 host, port = (rest.split(":") + ["1883"])[:2]
 port = int(port)
 
+# Physics runs every STEP_S; telemetry is published by exception (PIXKIT_REPORT_* in .env)
+STEP_S = float(os.getenv("PIXKIT_SIM_STEP_S", "0.2"))
+reporter = Reporter(ReportPolicy.from_env())
+
 client = mqtt.Client()
 if proto == "mqtts":
     client.tls_set()
@@ -30,44 +42,80 @@ speed = 0.0
 battery = 95.0
 temperature = 35.0
 seq = 0
+last_critical = {}  # sender -> (cmdSeq, command) of its latest critical command
 
 def publish_status():
     client.publish(topic_status, json.dumps({
         "deviceId": device_id,
         "status": "running" if running else "stopped",
-        "ts": time.strftime("%Y-%m-%dT%H:%M:%S.%fZ", time.gmtime()),
+        "ts": now_iso(),
         "seq": seq,
     }), qos=1)
 
-def publish_telemetry():
-    global speed, battery, temperature, seq
-    # Simple dynamics model
-    target_speed = throttle * (10.0 if mode == "sport" else 7.0 if mode == "cruise" else 5.0)
-    speed += (target_speed - speed) * 0.2
+def step(dt):
+    global speed, battery, temperature
+    # Simple dynamics model (rates per second, scaled by dt)
+    alpha = 1.0 - 0.8 ** dt
+    drive = throttle if running else 0.0  # a stopped car coasts down whatever throttle says
+    target_speed = drive * (10.0 if mode == "sport" else 7.0 if mode == "cruise" else 5.0)
+    speed += (target_speed - speed) * alpha
     speed = max(0.0, speed)
-    battery -= 0.01 + throttle * 0.02
+    battery -= (0.01 + drive * 0.02) * dt
     battery = max(0.0, battery)
-    temperature = 30.0 + throttle * 15.0 + random.uniform(-1, 1)
-    seq += 1
+    temperature += (30.0 + drive * 15.0 - temperature) * alpha + random.uniform(-0.1, 0.1) * dt
 
-    client.publish(topic_tel, json.dumps({
+def publish_telemetry():
+    global seq
+    msg = reporter.offer({
         "deviceId": device_id,
         "status": "running" if running else "stopped",
+        "mode": mode,
+        "throttle": throttle,
+        "steering": steering,
         "metrics": {
             "speed": round(speed, 2),
             "battery": round(battery, 2),
             "temperature": round(temperature, 2),
         },
-        "ts": time.strftime("%Y-%m-%dT%H:%M:%S.%fZ", time.gmtime()),
-        "seq": seq,
-    }), qos=1)
+        "ts": now_iso(),
+    })
+    if msg is None:
+        return
+    # seq counts published messages only, so a gap at the receiver means loss
+    seq += 1
+    msg["seq"] = seq
+    client.publish(topic_tel, json.dumps(msg), qos=1)
+    publish_status()
+
+def superseded_by(cmd):
+    """
+    The critical command that supersedes cmd, if cmd is a non-critical command older than its
+    sender's last critical one (MQTT keeps order per connection, but a QoS 1 redelivery can
+    still arrive after an emergency_stop). None when cmd should be applied.
+    """
+    sender, cmd_seq = cmd.get("sender"), cmd.get("cmdSeq")
+    if sender is None or not isinstance(cmd_seq, int):
+        return None
+    priority = cmd.get("priority")
+    if priority is None:
+        priority = priority_for(cmd.get("command", ""))
+    last_seq, last_cmd = last_critical.get(sender, (0, None))
+    if priority == CRITICAL:
+        if cmd_seq > last_seq:
+            last_critical[sender] = (cmd_seq, cmd.get("command"))
+        return None
+    return last_cmd if cmd_seq < last_seq else None
 
 def handle_command(payload):
-    global running, mode, throttle, steering
+    global running, mode, throttle, steering, speed
     cmd = json.loads(payload.decode("utf-8"))
+    tracing.mark(cmd, tracing.DEVICE_RECEIVE)
     c = cmd.get("command")
     params = cmd.get("params", {})
-    if c == "start":
+    by = superseded_by(cmd)
+    if by:
+        pass  # stale: leave state alone and reject it
+    elif c == "start":
         running = True
     elif c == "stop":
         running = False
@@ -86,13 +134,20 @@ def handle_command(payload):
         throttle = 0.0
     elif c == "firmware_update":
         pass
+    tracing.mark(cmd, tracing.DEVICE_APPLY)
 
+    tracing.mark(cmd, tracing.ACK_PUBLISH)
+    ts = now_iso()
     client.publish(f"{topic_ack_prefix}{cmd.get('correlationId','')}", json.dumps({
         "correlationId": cmd.get("correlationId"),
+        "command": c,
         "deviceId": device_id,
-        "accepted": True,
+        "accepted": by is None,
+        "message": f"Superseded by {by}" if by else "OK",
         "result": {"running": running, "mode": mode, "throttle": throttle},
-        "ts": time.strftime("%Y-%m-%dT%H:%M:%S.%fZ", time.gmtime()),
+        "ts": ts,
+        "ts_end": ts,  # same field name as Ack, so compute_latency_ms works on it
+        "trace": cmd["trace"],
     }), qos=1)
 
 def on_connect(c, u, f, rc):
@@ -108,14 +163,14 @@ client.connect(host, port, keepalive=30)
 client.loop_start()
 
 try:
+    last = time.monotonic()
     while True:
-        publish_status()
-        if running:
-            publish_telemetry()
-        else:
-            # Publish idle telemetry occasionally
-            publish_telemetry()
-        time.sleep(1.0)
+        now = time.monotonic()
+        step(now - last)
+        last = now
+        # Moving: up to every min interval; parked: heartbeat every max interval
+        publish_telemetry()
+        time.sleep(STEP_S)
 except KeyboardInterrupt:
     client.loop_stop()
     client.disconnect()
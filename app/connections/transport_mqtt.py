@@ -1,87 +1,107 @@
 
 # transport_mqtt.py
-import os, json, time
-from typing import Callable
-from paho.mqtt import client as mqtt
+import itertools, os, json, time, uuid
+from typing import Callable, Optional
+from connections.mqtt_manager import get_manager
+from pixkit_core import metrics, tracing
+from pixkit_core.events import CONTROL
+from pixkit_transports.base import BaseTransport
+from pixkit_transports.reorder import Resequencer
 
-class PixkitMqttClient:
-    def __init__(self, device_id, on_telemetry: Callable, on_ack: Callable,
-                 on_connected: Callable, on_disconnected: Callable):
-        self.device_id = device_id
-        self.on_telemetry = on_telemetry
-        self.on_ack = on_ack
-        self.on_connected = on_connected
-        self.on_disconnected = on_disconnected
-
-        url = os.getenv("MQTT_URL", "mqtt://localhost:1883")
-        # Parse URL simple
-        proto, rest = url.split("://", 1)
-        host_port = rest
-        if ":" in host_port:
-            host, port = host_port.split(":")
-            port = int(port)
-        else:
-            host, port = host_port, 1883
 
-        self.client = mqtt.Client()
-        user = os.getenv("MQTT_USER", "")
-        pw = os.getenv("MQTT_PASS", "")
-        if user:
-            self.client.username_pw_set(user, pw)
+class PixkitMqttClient(BaseTransport):
+    def __init__(self, device_id, on_telemetry: Callable, on_ack: Callable,
+                 on_connected: Optional[Callable] = None, on_disconnected: Optional[Callable] = None):
+        super().__init__(device_id, on_telemetry, on_ack, on_connected, on_disconnected)
 
-        # TLS optional: if proto == 'mqtts', enable tls
-        if proto == "mqtts":
-            self.client.tls_set()
+        # One shared broker connection per process; this client only holds refcounted subscriptions
+        self.conn = get_manager()
 
         base = os.getenv("MQTT_TOPIC_BASE", "pixkit")
         self.topic_cmd = f"{base}/{device_id}/command"
         self.topic_tel = f"{base}/{device_id}/telemetry"
         self.topic_status = f"{base}/{device_id}/status"
         self.topic_ack_prefix = f"{base}/ack/"
+        self._filters = [self.topic_tel, self.topic_status, f"{self.topic_ack_prefix}+"]
+        self._subscribed = False
+        # Commands carry (sender, cmdSeq) so the device can drop a non-critical command that
+        # reaches it after a later critical one from the same sender (e.g. a QoS 1 redelivery)
+        self.sender = uuid.uuid4().hex[:12]
+        self._cmd_seq = itertools.count(1)
 
-        self.client.on_connect = self._on_connect
-        self.client.on_message = self._on_message
-        self.client.on_disconnect = lambda *_: self.on_disconnected()
-
-        self.host, self.port = host, port
+        # QoS 1 may redeliver / reorder: resequence telemetry+status by seq; the sequencer
+        # delivers (from push and its hold timer alike) under one lock, so order survives
+        self.sequencer = Resequencer(window=int(os.getenv("PIXKIT_REORDER_WINDOW", "8")), name="mqtt.rx",
+                                     deliver=lambda m: self.on_telemetry(m))
 
     def connect(self):
-        self.client.connect(self.host, self.port, keepalive=30)
-        self.client.loop_forever()
+        """Register this client's subscriptions on the shared connection (non-blocking)."""
+        if self._subscribed:
+            return
+        self._subscribed = True
+        for f in self._filters:
+            self.conn.subscribe(f, self._on_shared_message)
+        self.conn.add_listener(self.on_connected, self.on_disconnected)
+        self.conn.start()
+
+    def disconnect(self):
+        if not self._subscribed:
+            return
+        self._subscribed = False
+        self.conn.remove_listener(self.on_connected, self.on_disconnected)
+        for f in self._filters:
+            self.conn.unsubscribe(f, self._on_shared_message)
+        self.sequencer.close()
+        self.on_disconnected()
+
+    def tick(self, **kwargs):
+        pass  # network-driven; nothing to advance
 
-    def _on_connect(self, client, userdata, flags, rc):
-        if rc == 0:
-            self.on_connected()
-            client.subscribe(self.topic_tel)
-            client.subscribe(self.topic_status)
-            client.subscribe(f"{self.topic_ack_prefix}+")
-        else:
-            self.on_disconnected()
+    def _on_shared_message(self, msg):
+        self._on_message(None, None, msg)
 
     def _on_message(self, client, userdata, msg):
+        metrics.incr("mqtt.messages_in")
         try:
-            data = json.loads(msg.payload.decode("utf-8"))
+            with metrics.timer("mqtt.decode"):
+                data = json.loads(msg.payload.decode("utf-8"))
         except Exception:
+            metrics.incr("mqtt.decode_errors")
             return
         topic = msg.topic
-        if topic == self.topic_tel:
-            data["type"] = "telemetry"
-            self.on_telemetry(data)
-        elif topic == self.topic_status:
-            data["type"] = "status"
-            self.on_telemetry(data)
-        elif topic.startswith(self.topic_ack_prefix):
-            data["type"] = "ack"
-            self.on_ack(data)
+        with metrics.timer("mqtt.dispatch"):
+            if topic == self.topic_tel:
+                data["type"] = "telemetry"
+                self.sequencer.push(data)
+            elif topic == self.topic_status:
+                data["type"] = "status"
+                self.sequencer.push(data)
+            elif topic.startswith(self.topic_ack_prefix):
+                if data.get("deviceId", self.device_id) != self.device_id:
+                    return  # ack wildcard is shared across devices on this connection
+                data["type"] = "ack"
+                tracing.mark(data, tracing.ACK_RECEIVE)
+                self.on_ack(data)
 
-    def send_command(self, command: str, params: dict):
-        # Attach metadata
+    def send_command(self, command: str, params: dict = None, meta: dict = None):
+        # Attach metadata (controller-provided meta wins, so correlation + trace survive the hop)
+        meta = meta or {}
+        tracing.mark(meta, tracing.TRANSPORT_SEND)
+        priority = int(meta.get("priority", CONTROL))
         payload = {
             "deviceId": self.device_id,
             "command": command,
+            "priority": priority,
+            "sender": self.sender,
+            "cmdSeq": next(self._cmd_seq),
             "params": params or {},
-            "correlationId": str(int(time.time()*1000)),
-            "requestedBy": os.getenv("USER", "streamlit"),
+            "correlationId": meta.get("correlationId") or str(int(time.time()*1000)),
+            "requestedBy": meta.get("requestedBy") or os.getenv("USER", "streamlit"),
             "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "trace": meta["trace"],
         }
-        self.client.publish(self.topic_cmd, json.dumps(payload), qos=1, retain=False)
+        with metrics.timer("mqtt.encode"):
+            body = json.dumps(payload)
+        # Every lane shares the command topic's connection, so the broker keeps send order
+        self.conn.publish(self.topic_cmd, body, qos=1, retain=False)
+        metrics.incr("mqtt.commands_out")
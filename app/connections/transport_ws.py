@@ -2,45 +2,64 @@
 # transport_ws.py
 import os, json, time
 from websocket import create_connection
+from pixkit_core import metrics, tracing
+from pixkit_transports.base import BaseTransport
+from pixkit_transports.reorder import Resequencer
 
-class PixkitWsClient:
-    def __init__(self, device_id, on_telemetry, on_ack, on_connected, on_disconnected):
-        self.device_id = device_id
-        self.on_telemetry = on_telemetry
-        self.on_ack = on_ack
-        self.on_connected = on_connected
-        self.on_disconnected = on_disconnected
+class PixkitWsClient(BaseTransport):
+    def __init__(self, device_id, on_telemetry, on_ack, on_connected=None, on_disconnected=None):
+        super().__init__(device_id, on_telemetry, on_ack, on_connected, on_disconnected)
         self.ws_url = os.getenv("WS_URL", "wss://localhost:3000/ws")
+        self.sequencer = Resequencer(window=int(os.getenv("PIXKIT_REORDER_WINDOW", "8")), name="ws.rx",
+                                     deliver=lambda m: self.on_telemetry(m))
+        self.ws = None
 
     def connect(self):
         try:
-            ws = create_connection(self.ws_url)
+            self.ws = ws = create_connection(self.ws_url)
             self.on_connected()
             while True:
                 msg = ws.recv()
-                data = json.loads(msg)
+                metrics.incr("ws.messages_in")
+                with metrics.timer("ws.decode"):
+                    data = json.loads(msg)
                 # Expect { type: 'telemetry'|'status'|'ack', deviceId: ... }
                 if data.get("deviceId") != self.device_id:
                     continue
                 t = data.get("type")
-                if t in ("telemetry", "status"):
-                    self.on_telemetry(data)
-                elif t == "ack":
-                    self.on_ack(data)
+                with metrics.timer("ws.dispatch"):
+                    if t in ("telemetry", "status"):
+                        self.sequencer.push(data)  # delivers in seq order via on_telemetry
+                    elif t == "ack":
+                        tracing.mark(data, tracing.ACK_RECEIVE)
+                        self.on_ack(data)
         except Exception:
             self.on_disconnected()
 
-    def send_command(self, command, params):
+    def disconnect(self):
+        self.sequencer.close()
+        if self.ws is not None:
+            self.ws.close()
+            self.ws = None
+
+    def tick(self, **kwargs):
+        pass  # network-driven; nothing to advance
+
+    def send_command(self, command, params=None, meta=None):
         # For WS, we assume server expects a JSON envelope
         # Adjust to your backend contract.
+        meta = meta or {}
+        tracing.mark(meta, tracing.TRANSPORT_SEND)
         payload = {
             "deviceId": self.device_id,
             "type": "command",
             "command": command,
+            "priority": meta.get("priority"),
             "params": params or {},
-            "correlationId": str(int(time.time()*1000)),
-            "requestedBy": os.getenv("USER", "streamlit"),
+            "correlationId": meta.get("correlationId") or str(int(time.time()*1000)),
+            "requestedBy": meta.get("requestedBy") or os.getenv("USER", "streamlit"),
             "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "trace": meta["trace"],
         }
         # In a simple WS only-subscription scenario, you might POST via REST instead.
         # Here we demo a direct send if WS supports it:
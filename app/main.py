@@ -1,15 +1,19 @@
 
 # app.py
-import os, json, time
+import os, json, math, time
 import streamlit as st
 import pandas as pd
 from dotenv import load_dotenv
 
-from pixkit_core.events import compute_latency_ms
-from pixkit_transports.sim import SimTransport
+from pixkit_core import metrics
+from pixkit_core.reporting import link_state
+from pixkit_core.utils import iso_to_epoch
 from services.controller import PixkitController
+from services.engine import SimEngine
+from pixkit_transports.registry import get_transport_class
 
 
+_render_t0 = metrics.now()
 load_dotenv()
 TRANSPORT = os.getenv("PIXKIT_TRANSPORT", "sim").lower()
 DEVICE_ID = os.getenv("PIXKIT_DEVICE_ID", "pixkit-car-local")
@@ -21,6 +25,22 @@ st.caption("UI runs against a local simulation layer so behavior is consistent f
 # -------------------------------
 # Session init & wiring
 # -------------------------------
+@st.cache_resource
+def get_engine() -> SimEngine:
+    """One simulation per device for the whole process, shared by all sessions."""
+    record_path = os.getenv("PIXKIT_RECORD_PATH") or None
+    return SimEngine(transport_factory=get_transport_class(TRANSPORT), record_path=record_path)
+
+@st.cache_resource
+def get_metrics_server():
+    """Local Prometheus-text endpoint (http://127.0.0.1:$PIXKIT_METRICS_PORT/metrics), started once per process."""
+    if not metrics.ENABLED:
+        return None
+    try:
+        return metrics.serve()
+    except OSError:
+        return None  # port taken (e.g. another dashboard process); panel still works
+
 def init_state():
     if "telemetry_buffer" not in st.session_state:
         st.session_state.telemetry_buffer = []
@@ -36,64 +56,70 @@ def init_state():
         st.session_state.refresh_ms = 1000
     if "noise_level" not in st.session_state:
         st.session_state.noise_level = 0.1
-    if "latency_range" not in st.session_state:
-        st.session_state.latency_range = (150, 900)
-    if "failure_rate" not in st.session_state:
-        st.session_state.failure_rate = 0.05  # 5% failures to test UX
+    if "twin_view" not in st.session_state:
+        st.session_state.twin_view = {}  # local copy of the device twin, patched with changed fields only
+        st.session_state.twin_rev = 0
 
-    # Wire transport + controller once
+    # Wire session to the shared engine once
     if "controller" not in st.session_state:
-        def on_telemetry(msg):
-            st.session_state.telemetry_buffer.append(msg)
-            st.session_state.telemetry_buffer = st.session_state.telemetry_buffer[-1000:]
-
-        def on_ack(ack):
-            # ack is dict: {correlation_id, command, accepted, message, ts_end, result{...}}
-            st.session_state.last_ack = ack
-            # Look up action for latency
-            action = st.session_state.controller.get_action(ack["correlation_id"])
-            latency_ms = None
-            if action:
-                latency_ms = compute_latency_ms(action, type("AckObj",(object,),ack)())
-                st.session_state.controller.clear_action(ack["correlation_id"])
-
-            # Build log entry
-            log_entry = {
-                "type": "ack",
-                "correlation_id": ack.get("correlation_id"),
-                "command": ack.get("command"),
-                "accepted": ack.get("accepted"),
-                "message": ack.get("message"),
-                "latency_ms": latency_ms,
-                "ts_end": ack.get("ts_end"),
-                "result": ack.get("result", {}),
-            }
-            st.session_state.logs.append(log_entry)
-            st.session_state.logs = st.session_state.logs[-300:]
-
-            # Immediate UI feedback
-            if ack.get("accepted"):
-                st.toast(f"✅ {ack.get('command')} OK ({latency_ms} ms)", icon="✅")
-            else:
-                st.toast(f"❌ {ack.get('command')} failed ({latency_ms} ms): {ack.get('message')}", icon="❌")
-
-        # Choose transport
-        if TRANSPORT == "sim":
-            transport = SimTransport(device_id=DEVICE_ID, on_telemetry=on_telemetry, on_ack=on_ack)
+        get_metrics_server()
+        if TRANSPORT in ("sim", "replay"):
+            engine = get_engine()
+            st.session_state.engine = engine
+            st.session_state.subs = engine.subscribe(DEVICE_ID)
+            st.session_state.controller = engine.controller(DEVICE_ID)
             st.session_state.connected = True
         else:
-            transport = None
+            st.session_state.engine = None
+            st.session_state.subs = None
+            st.session_state.controller = PixkitController(None)
             st.session_state.connected = False
 
-        # Controller
-        st.session_state.controller = PixkitController(transport)
-
-        # Apply initial mock policy
-        min_ms, max_ms = st.session_state.latency_range
-        st.session_state.controller.set_mock_policy(min_ms, max_ms, st.session_state.failure_rate)
+def on_telemetry(msg):
+    st.session_state.telemetry_buffer.append(msg)
+    st.session_state.telemetry_buffer = st.session_state.telemetry_buffer[-1000:]
+
+def on_ack(ack):
+    # ack is dict: {correlation_id, command, accepted, message, ts_end, result{...}, latency_ms}
+    # rule alerts arrive on the same path with type="alert" (see services.rules)
+    # (latency is computed once by the engine, which owns correlation tracking)
+    st.session_state.last_ack = ack
+    latency_ms = ack.get("latency_ms")
+
+    # Build log entry
+    log_entry = {
+        "type": ack.get("type", "ack"),
+        "correlation_id": ack.get("correlation_id"),
+        "command": ack.get("command"),
+        "accepted": ack.get("accepted"),
+        "message": ack.get("message"),
+        "latency_ms": latency_ms,
+        "ts_end": ack.get("ts_end"),
+        "result": ack.get("result", {}),
+    }
+    st.session_state.logs.append(log_entry)
+    st.session_state.logs = st.session_state.logs[-300:]
+
+    if ack.get("type") == "alert":
+        if ack["result"]["state"] == "raised":
+            st.toast(f"⚠️ {ack.get('message')}", icon="⚠️")
+        return
+
+    # Immediate UI feedback, only for actions issued from this session
+    if not any(a["correlation_id"] == ack.get("correlation_id") for a in st.session_state.activity):
+        return
+    if ack.get("accepted"):
+        st.toast(f"✅ {ack.get('command')} OK ({latency_ms} ms)", icon="✅")
+    else:
+        st.toast(f"❌ {ack.get('command')} failed ({latency_ms} ms): {ack.get('message')}", icon="❌")
 
 init_state()
 
+def execute(command: str, params: dict) -> str:
+    if st.session_state.engine:
+        return st.session_state.engine.execute(DEVICE_ID, command, params, requested_by="ui")
+    return st.session_state.controller.execute(command, params, requested_by="ui")
+
 def add_activity(command: str, params: dict, corr: str):
     st.session_state.activity.append({
         "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime()),
@@ -111,14 +137,26 @@ with st.sidebar:
     st.session_state.refresh_ms = st.slider("Refresh interval (ms)", 250, 3000, st.session_state.refresh_ms, 50)
     st.session_state.noise_level = st.slider("Telemetry noise", 0.0, 1.0, st.session_state.noise_level, 0.05)
 
-    min_lat, max_lat = st.session_state.latency_range
+    # Mock policy lives on the shared controller: show its current values, push only edits
+    ctrl = st.session_state.controller
+    if ctrl.mock_policy is None:
+        ctrl.set_mock_policy(150, 900, 0.05)  # dashboard defaults (5% failures to test UX)
+    min_lat, max_lat, failure_rate = ctrl.mock_policy
     min_lat = st.number_input("Min latency (ms)", min_value=0, max_value=5000, value=int(min_lat), step=50)
     max_lat = st.number_input("Max latency (ms)", min_value=0, max_value=5000, value=int(max_lat), step=50)
-    st.session_state.latency_range = (min_lat, max_lat)
-
-    st.session_state.failure_rate = st.slider("Failure rate", 0.0, 0.5, st.session_state.failure_rate, 0.01)
-    # Push policy to controller
-    st.session_state.controller.set_mock_policy(min_lat, max_lat, st.session_state.failure_rate)
+    failure_rate = st.slider("Failure rate", 0.0, 0.5, float(failure_rate), 0.01)
+    if (min_lat, max_lat, failure_rate) != ctrl.mock_policy:
+        ctrl.set_mock_policy(min_lat, max_lat, failure_rate)
+
+    net_options = ["off", "lan", "wifi", "lte", "degraded_cellular"]
+    cur_net, cur_seed = ctrl.network_model
+    net = st.selectbox("Network model", net_options, index=net_options.index(cur_net or "off"),
+                       help="Overrides latency above with a seeded network emulation")
+    net_seed = st.number_input("Network seed", min_value=0, max_value=2**31 - 1,
+                               value=42 if cur_seed is None else int(cur_seed), step=1)
+    net = None if net == "off" else net
+    if net != cur_net or (net and int(net_seed) != cur_seed):
+        ctrl.set_network_model(net, int(net_seed))
 
     st.divider()
     st.header("Export Telemetry")
@@ -136,6 +174,10 @@ with st.sidebar:
 # -------------------------------
 def render_activity_summary():
     logs_df = pd.DataFrame(st.session_state.logs)
+    if not logs_df.empty:
+        logs_df = logs_df[logs_df["type"] != "alert"]  # rule alerts share the log, but are not actions
+        # One outcome per action: a timeout followed by a late ack counts once (the latest row)
+        logs_df = logs_df.drop_duplicates("correlation_id", keep="last")
     total = len(logs_df)
     successes = int(logs_df["accepted"].sum()) if total else 0
     failures = total - successes
@@ -160,6 +202,7 @@ st.divider()
 c_status, c_dev, c_ack = st.columns(3)
 with c_status:
     st.metric("Connection", "Connected" if st.session_state.connected else "Disconnected")
+    link_caption = st.empty()  # filled after the telemetry tick/drain below, from this run's data
 with c_dev:
     st.metric("Device ID", DEVICE_ID)
 with c_ack:
@@ -176,11 +219,11 @@ c1, c2, c3, c4 = st.columns([1,1,1,1])
 
 with c1:
     if st.button("Start", width='stretch', type="primary"):
-        corr = st.session_state.controller.execute("start", {}, requested_by="ui")
+        corr = execute("start", {})
         add_activity("start", {}, corr)
 
     if st.button("Stop", width='stretch'):
-        corr = st.session_state.controller.execute("stop", {}, requested_by="ui")
+        corr = execute("stop", {})
         add_activity("stop", {}, corr)
 
 with c2:
@@ -192,7 +235,7 @@ with c2:
 
     if st.button("Apply Controls", width='stretch'):
         params = {"mode": mode, "throttle": throttle, "steering": steering}
-        corr = st.session_state.controller.execute("set_controls", params, requested_by="ui")
+        corr = execute("set_controls", params)
         add_activity("set_controls", params, corr)
 
 with c3:
@@ -200,12 +243,12 @@ with c3:
     horn = st.checkbox("Horn", value=bool(last.get("horn", False)))
     if st.button("Update Aux", width='stretch'):
         params = {"lights": lights, "horn": horn}
-        corr = st.session_state.controller.execute("set_aux", params, requested_by="ui")
+        corr = execute("set_aux", params)
         add_activity("set_aux", params, corr)
 
     st.markdown("**Emergency**")
     if st.button("EMERGENCY STOP", width='stretch'):
-        corr = st.session_state.controller.execute("emergency_stop", {"reason": "user_trigger"}, requested_by="ui")
+        corr = execute("emergency_stop", {"reason": "user_trigger"})
         add_activity("emergency_stop", {"reason": "user_trigger"}, corr)
 
 with c4:
@@ -213,7 +256,7 @@ with c4:
     target_fw = st.text_input("Target FW version", value=str(fw_ver))
     if st.button("Update Firmware", width='stretch'):
         params = {"version": target_fw}
-        corr = st.session_state.controller.execute("firmware_update", params, requested_by="ui")
+        corr = execute("firmware_update", params)
         add_activity("firmware_update", params, corr)
 
 st.divider()
@@ -221,8 +264,24 @@ st.divider()
 # -------------------------------
 # Telemetry tick & auto-refresh
 # -------------------------------
-if st.session_state.controller.transport:
-    st.session_state.controller.transport.tick(noise_level=st.session_state.noise_level)
+if st.session_state.engine:
+    st.session_state.engine.tick(DEVICE_ID, noise_level=st.session_state.noise_level)
+    metrics.gauge("ui.session_queue_depth", len(st.session_state.subs["telemetry"]))
+    for msg in st.session_state.subs["telemetry"].drain():
+        on_telemetry(msg)
+    for ack in st.session_state.subs["ack"].drain():
+        on_ack(ack)
+
+# Link state for the status row, now that this run's telemetry has been drained
+last_tel = st.session_state.telemetry_buffer[-1] if st.session_state.telemetry_buffer else {}
+if last_tel.get("report"):
+    age_s = time.time() - iso_to_epoch(last_tel["ts"])
+    state = link_state(last_tel["report"], age_s)
+    link_caption.caption(f"Telemetry {state}: last {last_tel['report']['reason']} {age_s:.0f}s ago")
+
+if st.session_state.engine:
+    changed, st.session_state.twin_rev = st.session_state.engine.twins.changes_since(DEVICE_ID, st.session_state.twin_rev)
+    st.session_state.twin_view.update(changed)
 
 #st.autorefresh(interval=st.session_state.refresh_ms, key="auto_refresh")
 
@@ -257,6 +316,35 @@ else:
     st.subheader("GPS (simulated)")
     st.dataframe(merged[["ts","lat","lon","speed","steering"]].tail(10), width='stretch')
 
+    if st.session_state.engine:
+        import pydeck as pdk  # only pay for pydeck when the map is rendered
+        st.subheader("Fleet Map")
+        # Viewport centred on this car; only devices inside it are fetched from the index
+        view_m = st.slider("Viewport half-width (m)", 100, 5000, 1000, 100)
+        lat0, lon0 = float(merged["lat"].iloc[-1]), float(merged["lon"].iloc[-1])
+        dlat = view_m / 111_000.0
+        dlon = dlat / max(1e-6, math.cos(math.radians(lat0)))
+        visible = st.session_state.engine.fleet.bbox(lat0 - dlat, lon0 - dlon, lat0 + dlat, lon0 + dlon)
+        zoom = max(1.0, min(20.0, math.log2(40_075_000 * math.cos(math.radians(lat0)) / (2 * view_m)) - 1))
+        st.pydeck_chart(pdk.Deck(
+            map_style=None,
+            initial_view_state=pdk.ViewState(latitude=lat0, longitude=lon0, zoom=zoom),
+            layers=[pdk.Layer(
+                "ScatterplotLayer",
+                data=visible,
+                get_position="[lon, lat]",
+                get_radius=6,
+                radius_min_pixels=4,
+                get_fill_color=[230, 60, 40],
+                pickable=True,
+            )],
+            tooltip={"text": "{deviceId}"},
+        ))
+        st.caption(f"{len(visible)} of {len(st.session_state.engine.fleet)} devices in view")
+
+    if st.session_state.twin_view:
+        st.expander(f"Device twin (rev {st.session_state.twin_rev})").json(st.session_state.twin_view)
+
     st.expander("Raw telemetry (last 50)").dataframe(pd.DataFrame(buf).tail(50), width='stretch')
 
 # -------------------------------
@@ -292,4 +380,38 @@ with b2:
             st.toast("Battery recharged to 100%", icon="🔋")
 with b3:
     st.caption("Swap to real transports later by implementing the same interface and updating `.env`.")
- 
\ No newline at end of file
+ 
+
+# -------------------------------
+# Diagnostics
+# -------------------------------
+metrics.observe("ui.render", metrics.now() - _render_t0)
+with st.expander("Diagnostics"):
+    if not metrics.ENABLED:
+        st.info("Instrumentation disabled (PIXKIT_METRICS=0).")
+    else:
+        snap = metrics.snapshot()
+        server = get_metrics_server()
+        if server:
+            st.caption(f"Prometheus endpoint: http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+        stages = pd.DataFrame.from_dict(snap["stages"], orient="index")
+        if not stages.empty:
+            st.write("Stages")
+            st.dataframe(stages.round(3), width='stretch')
+        if snap["counters"] or snap["gauges"]:
+            st.write("Counters & queue depths")
+            st.dataframe(pd.DataFrame(
+                [{"name": k, "kind": "counter", "value": v} for k, v in snap["counters"].items()]
+                + [{"name": k, "kind": "gauge", "value": v} for k, v in snap["gauges"].items()]
+            ), width='stretch')
+
+    traces = st.session_state.controller.traces
+    rows = traces.table(by="transport")
+    if rows:
+        st.write("Command latency breakdown (ms, histogram bucket bounds)")
+        st.dataframe(pd.DataFrame(rows), width='stretch')
+        st.dataframe(pd.DataFrame(traces.table(by="command")), width='stretch')
+        trace_file = st.text_input("Trace filename (Chrome trace format)", "pixkit_traces.json")
+        if st.button("Export Traces", width='stretch'):
+            n = traces.export_chrome(trace_file)
+            st.success(f"Exported {trace_file} ({n} traces).")
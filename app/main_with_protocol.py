@@ -3,14 +3,42 @@ import streamlit as st
 import pandas as pd
 from dotenv import load_dotenv
 
+from services.controller import PixkitController
+from services.dispatch import Dispatcher
+from pixkit_transports.registry import create_transport
+from pixkit_transports.replay import Recorder
+
 load_dotenv()
 
 TRANSPORT = os.getenv("PIXKIT_TRANSPORT", "mqtt").lower()
 DEVICE_ID = os.getenv("PIXKIT_DEVICE_ID", "pixkit-car-001")
+DISPATCH_POLICY = os.getenv("PIXKIT_DISPATCH_POLICY", "drop_oldest").lower()
+DISPATCH_BLOCK_TIMEOUT_S = float(os.getenv("PIXKIT_DISPATCH_BLOCK_TIMEOUT_S", "0.5"))
+RECORD_PATH = os.getenv("PIXKIT_RECORD_PATH") or None
+
+
+@st.cache_resource
+def get_recording_tap():
+    """
+    One recording connection per process for $PIXKIT_RECORD_PATH, so the device's field traffic
+    is logged exactly once however many dashboard sessions are open (and outlives any of them).
+    In-process transports (sim, replay) have no field traffic to tap; main.py records the simulator.
+    """
+    if not RECORD_PATH or TRANSPORT in ("sim", "replay"):
+        return None
+    recorder = Recorder(RECORD_PATH)
+    tap = create_transport(TRANSPORT, device_id=DEVICE_ID, on_telemetry=lambda _: None, on_ack=lambda _: None)
+    recorder.attach(tap)
+    threading.Thread(target=tap.connect, daemon=True).start()
+    return tap, recorder
 
 # Session state init
 if "telemetry_buffer" not in st.session_state:
     st.session_state.telemetry_buffer = []  # list of dicts
+if "telemetry_dispatch" not in st.session_state:
+    # Bounded hand-off from the network thread; drained once per rerun below
+    st.session_state.telemetry_dispatch = Dispatcher(maxsize=1000, policy=DISPATCH_POLICY,
+                                                      block_timeout_s=DISPATCH_BLOCK_TIMEOUT_S)
 if "connected" not in st.session_state:
     st.session_state.connected = False
 if "last_ack" not in st.session_state:
@@ -18,30 +46,35 @@ if "last_ack" not in st.session_state:
 if "command_busy" not in st.session_state:
     st.session_state.command_busy = False
 
-st.title = 'UI test'
-
-'''# Transport selection
-client = None
-if TRANSPORT == "mqtt":
-    from transport_mqtt import PixkitMqttClient
-    client = PixkitMqttClient(
-        device_id=DEVICE_ID,
-        on_telemetry=lambda msg: st.session_state.telemetry_buffer.append(msg),
-        on_ack=lambda ack: setattr(st.session_state, "last_ack", ack),
-        on_connected=lambda: setattr(st.session_state, "connected", True),
-        on_disconnected=lambda: setattr(st.session_state, "connected", False),
-    )
-elif TRANSPORT == "ws":
-    from transport_ws import PixkitWsClient
-    client = PixkitWsClient(
-        device_id=DEVICE_ID,
-        on_telemetry=lambda msg: st.session_state.telemetry_buffer.append(msg),
-        on_ack=lambda ack: setattr(st.session_state, "last_ack", ack),
-        on_connected=lambda: setattr(st.session_state, "connected", True),
-        on_disconnected=lambda: setattr(st.session_state, "connected", False),
-    )
-else:
-    st.stop()'''
+telemetry_dispatch = st.session_state.telemetry_dispatch
+
+# Transport selection (registry imports only the selected transport module, on first use)
+if "client" not in st.session_state:
+    # Commands go through the controller so acks feed its per-transport trace histograms
+    controller = PixkitController(None)
+
+    def on_ack(ack, controller=controller):
+        corr = ack.get("correlation_id") or ack.get("correlationId")
+        controller.record_ack(ack)
+        controller.clear_action(corr)
+        st.session_state.last_ack = ack
+
+    try:
+        st.session_state.client = create_transport(
+            TRANSPORT,
+            device_id=DEVICE_ID,
+            on_telemetry=telemetry_dispatch.put,
+            on_ack=on_ack,
+            on_connected=lambda: setattr(st.session_state, "connected", True),
+            on_disconnected=lambda: setattr(st.session_state, "connected", False),
+        )
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+    controller.transport = st.session_state.client
+    st.session_state.controller = controller
+client = st.session_state.client
+controller = st.session_state.controller
 
 # Background connect on first run
 def ensure_connected():
@@ -49,6 +82,7 @@ def ensure_connected():
         threading.Thread(target=client.connect, daemon=True).start()
 
 ensure_connected()
+recording = get_recording_tap()
 
 # --- UI Layout ---
 st.set_page_config(page_title="Pixkit Remote Control", layout="wide")
@@ -72,12 +106,12 @@ c1, c2, c3, c4 = st.columns([1,1,1,1])
 with c1:
     if st.button("Start", use_container_width=True, type="primary", disabled=st.session_state.command_busy):
         st.session_state.command_busy = True
-        client.send_command("start", {})
+        controller.execute("start", {}, requested_by="ui")
         st.session_state.command_busy = False
 
     if st.button("Stop", use_container_width=True, disabled=st.session_state.command_busy):
         st.session_state.command_busy = True
-        client.send_command("stop", {})
+        controller.execute("stop", {}, requested_by="ui")
         st.session_state.command_busy = False
 
 with c2:
@@ -87,28 +121,30 @@ with c2:
     apply = st.button("Apply Controls", use_container_width=True)
     if apply:
         # bounds safety check
-        client.send_command("set_controls", {"mode": mode, "throttle": throttle, "steering": steering})
+        controller.execute("set_controls", {"mode": mode, "throttle": throttle, "steering": steering}, requested_by="ui")
 
 with c3:
     lights = st.selectbox("Lights", ["off", "low", "high", "hazard"])
     horn = st.checkbox("Horn", value=False)
     if st.button("Update Aux", use_container_width=True):
-        client.send_command("set_aux", {"lights": lights, "horn": horn})
+        controller.execute("set_aux", {"lights": lights, "horn": horn}, requested_by="ui")
 
     st.markdown("**Emergency**")
     if st.button("EMERGENCY STOP", use_container_width=True):
-        client.send_command("emergency_stop", {"reason": "user_trigger"})
+        controller.execute("emergency_stop", {"reason": "user_trigger"}, requested_by="ui")
 
 with c4:
     st.markdown("**Firmware**")
     fw_ver = st.text_input("Target FW version", value="1.0.0")
     if st.button("Update Firmware", use_container_width=True):
-        client.send_command("firmware_update", {"version": fw_ver})
+        controller.execute("firmware_update", {"version": fw_ver}, requested_by="ui")
 
 st.divider()
 
 # Telemetry
 st.subheader("Live Telemetry")
+st.session_state.telemetry_buffer.extend(st.session_state.telemetry_dispatch.drain())
+st.session_state.telemetry_buffer = st.session_state.telemetry_buffer[-1000:]
 buffer = st.session_state.telemetry_buffer[-500:]  # keep last 500
 df = pd.DataFrame(buffer)
 
@@ -132,8 +168,18 @@ else:
 
     st.expander("Raw telemetry (last 50)").dataframe(df.tail(50), use_container_width=True)
 
+if recording:
+    recording[1].flush()
+    st.caption(f"Recording to {RECORD_PATH}: {recording[1].count} messages")
+st.caption("Dispatch queue: " + ", ".join(f"{k}={v}" for k, v in st.session_state.telemetry_dispatch.stats().items()))
+
 st.divider()
 st.subheader("Audit / Logs")
 st.caption("Prototype: showing last acks & commands only")
 st.write("Last Ack")
 st.code(json.dumps(st.session_state.last_ack or {}, indent=2))
+
+trace_rows = controller.traces.table(by="transport")
+if trace_rows:
+    st.write("Command latency breakdown (ms, histogram bucket bounds)")
+    st.dataframe(pd.DataFrame(trace_rows), use_container_width=True)
@@ -5,6 +5,10 @@ from dataclasses import dataclass, field
 from typing import Dict, Tuple
 import math, random
 from .utils import clamp, now_iso
+from . import metrics
+
+MODE_MAX_SPEED = {"manual": 8.0, "cruise": 10.0, "sport": 14.0, "eco": 7.0}  # km/h
+STEP_S = 0.2  # simulated seconds per step() at the default dt (rates below are per step of this length)
 
 @dataclass
 class Car:
@@ -63,31 +67,34 @@ class Car:
 
     # Physics
     def _mode_max_speed(self) -> float:
-        return {"manual": 8.0, "cruise": 10.0, "sport": 14.0, "eco": 7.0}.get(self.mode, 8.0)
+        return MODE_MAX_SPEED.get(self.mode, MODE_MAX_SPEED["manual"])
 
-    def _simulate_gps(self, speed_kmh: float, steering: float) -> Tuple[float, float]:
+    def _simulate_gps(self, speed_kmh: float, steering: float, dt: float = STEP_S) -> Tuple[float, float]:
         speed_ms = speed_kmh / 3.6
-        self._heading_rad += clamp(steering, -1, 1) * 0.08
-        dx = speed_ms * math.cos(self._heading_rad) * 0.2  # ~1s step
-        dy = speed_ms * math.sin(self._heading_rad) * 0.2
+        self._heading_rad += clamp(steering, -1, 1) * 0.08 * (dt / STEP_S)
+        dx = speed_ms * math.cos(self._heading_rad) * dt
+        dy = speed_ms * math.sin(self._heading_rad) * dt
         dlat = dy / 111_000.0
         dlon = dx / (111_000.0 * math.cos(math.radians(self.gps["lat"])))
         return round(self.gps["lat"] + dlat, 6), round(self.gps["lon"] + dlon, 6)
 
-    def step(self, noise_level: float = 0.1) -> Dict:
+    @metrics.timed("car.step")
+    def step(self, noise_level: float = 0.1, dt: float = STEP_S) -> Dict:
+        """Advance the model by dt simulated seconds (rates are calibrated per STEP_S)."""
+        k = dt / STEP_S
         target_speed = self.throttle * self._mode_max_speed()
-        self.speed_kmh += (target_speed - self.speed_kmh) * 0.25
+        self.speed_kmh += (target_speed - self.speed_kmh) * (1.0 - 0.75 ** k)
         self.speed_kmh = max(0.0, self.speed_kmh)
 
         base_drain = 0.005
         drain_noise = random.uniform(-0.002, 0.002) * noise_level
-        self.battery_pct = clamp(self.battery_pct - (base_drain + self.throttle * 0.02 + drain_noise), 0.0, 100.0)
+        self.battery_pct = clamp(self.battery_pct - (base_drain + self.throttle * 0.02 + drain_noise) * k, 0.0, 100.0)
 
         temp_delta = (self.throttle * 0.8) - (0.05 if not self.running else 0.0)
         temp_noise = random.uniform(-0.05, 0.05) * noise_level
-        self.temperature_c = clamp(self.temperature_c + temp_delta + temp_noise, 10.0, 90.0)
+        self.temperature_c = clamp(self.temperature_c + (temp_delta + temp_noise) * k, 10.0, 90.0)
 
-        nlat, nlon = self._simulate_gps(self.speed_kmh, self.steering)
+        nlat, nlon = self._simulate_gps(self.speed_kmh, self.steering, dt)
         self.gps["lat"], self.gps["lon"] = nlat, nlon
 
         self._sync_status()
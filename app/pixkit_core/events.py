@@ -1,8 +1,23 @@
-from dataclasses import dataclass
-from typing import Dict
+from dataclasses import dataclass, field
+from typing import Dict, List
 
 from datetime import datetime
 
+# Command priority lanes (lower value = more urgent)
+CRITICAL, CONTROL, AUXILIARY, BULK = 0, 1, 2, 3
+PRIORITY_NAMES = {CRITICAL: "critical", CONTROL: "control", AUXILIARY: "auxiliary", BULK: "bulk"}
+COMMAND_PRIORITY = {
+    "emergency_stop": CRITICAL,
+    "start": CONTROL,
+    "stop": CONTROL,
+    "set_controls": CONTROL,
+    "set_aux": AUXILIARY,
+    "firmware_update": BULK,
+}
+
+def priority_for(command: str) -> int:
+    return COMMAND_PRIORITY.get(command.lower(), CONTROL)
+
 @dataclass
 class Action:
     correlation_id: str
@@ -10,6 +25,7 @@ class Action:
     params: Dict
     requested_by: str
     ts_start: str
+    priority: int = CONTROL
 
 @dataclass
 class Ack:
@@ -20,6 +36,7 @@ class Ack:
     message: str
     ts_end: str
     result: Dict
+    trace: List = field(default_factory=list)  # [[stage, epoch_s], ...] see pixkit_core.tracing
 
 def compute_latency_ms(action: Action, ack: Ack) -> int:
     fmt = "%Y-%m-%dT%H:%M:%S.%fZ"
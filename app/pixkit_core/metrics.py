@@ -0,0 +1,252 @@
+"""
+Lightweight hot-path instrumentation.
+
+    from pixkit_core import metrics
+
+    @metrics.timed("car.step")          # wraps only if metrics are enabled at import time
+    def step(...): ...
+
+    with metrics.timer("mqtt.decode"):  # shared no-op context when disabled
+        ...
+
+    metrics.incr("mqtt.messages")
+    metrics.gauge("sim.pending", len(queue), device=device_id)   # labels keep one family per metric
+
+Set PIXKIT_METRICS=0 to switch everything off; decorated functions are then left
+unwrapped, so the disabled cost is zero on those paths.
+"""
+import os, threading, time
+from collections import deque
+from functools import wraps
+from typing import Dict, List, Optional
+
+ENABLED = os.getenv("PIXKIT_METRICS", "1").lower() not in ("0", "false", "off", "no")
+RESERVOIR = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+_clock = time.perf_counter  # monotonic, high resolution
+
+
+class StageStats:
+    """Count / sum plus a ring of recent (end_time, duration) samples for rates and percentiles."""
+
+    __slots__ = ("count", "total_s", "_recent", "_lock")
+
+    def __init__(self, maxlen: int = RESERVOIR):
+        self.count = 0
+        self.total_s = 0.0
+        self._recent = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, now: Optional[float] = None) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_s += seconds
+            self._recent.append((_clock() if now is None else now, seconds))
+
+    def summary(self) -> Dict:
+        with self._lock:
+            recent = list(self._recent)
+            count, total = self.count, self.total_s
+        durations = sorted(d for _, d in recent)
+        out = {"count": count, "sum_s": total, "rate_per_s": 0.0}
+        if len(recent) > 1 and recent[-1][0] > recent[0][0]:
+            out["rate_per_s"] = (len(recent) - 1) / (recent[-1][0] - recent[0][0])
+        for q in QUANTILES:
+            out[f"p{int(q * 100)}_ms"] = _quantile(durations, q) * 1000.0 if durations else None
+        return out
+
+
+def _quantile(sorted_vals: List[float], q: float) -> float:
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+
+    def stage(self, name: str) -> StageStats:
+        st = self.stages.get(name)
+        if st is None:
+            with self._lock:
+                st = self.stages.setdefault(name, StageStats())
+        return st
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        self.gauges[_series(name, labels) if labels else name] = value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stages = dict(self.stages)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        return {
+            "stages": {k: v.summary() for k, v in sorted(stages.items())},
+            "counters": dict(sorted(counters.items())),
+            "gauges": dict(sorted(gauges.items())),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+
+REGISTRY = Registry()
+
+
+class _Timer:
+    __slots__ = ("_stats", "_t0")
+
+    def __init__(self, stats: StageStats):
+        self._stats = stats
+
+    def __enter__(self):
+        self._t0 = _clock()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = _clock()
+        self._stats.observe(t1 - self._t0, now=t1)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str):
+    """Context manager timing one stage."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(REGISTRY.stage(name))
+
+
+def timed(name: str):
+    """Decorator timing every call of the wrapped function as stage `name`."""
+    def deco(fn):
+        if not ENABLED:
+            return fn
+        stats = REGISTRY.stage(name)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = _clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                t1 = _clock()
+                stats.observe(t1 - t0, now=t1)
+        return wrapper
+    return deco
+
+
+def observe(name: str, seconds: float) -> None:
+    if ENABLED:
+        REGISTRY.stage(name).observe(seconds)
+
+
+def incr(name: str, n: int = 1) -> None:
+    if ENABLED:
+        REGISTRY.incr(name, n)
+
+
+def gauge(name: str, value: float, **labels: str) -> None:
+    """Set a gauge; keyword labels (e.g. device=...) become Prometheus labels on one metric family."""
+    if ENABLED:
+        REGISTRY.gauge(name, value, labels)
+
+
+def now() -> float:
+    """Monotonic clock used by all timers (seconds)."""
+    return _clock()
+
+
+def snapshot() -> Dict:
+    return REGISTRY.snapshot()
+
+
+# -------------------------------
+# Prometheus text exposition
+# -------------------------------
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _series(name: str, labels: Dict[str, str]) -> str:
+    """Series key 'name{k="v",...}' (label values escaped per the text format)."""
+    def esc(v) -> str:
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return name + "{" + ",".join(f'{_metric_name(k)}="{esc(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+def render_prometheus(snap: Optional[Dict] = None) -> str:
+    snap = snap or snapshot()
+    lines = []
+    if snap["stages"]:
+        lines.append("# HELP pixkit_stage_seconds Time spent per instrumented stage.")
+        lines.append("# TYPE pixkit_stage_seconds summary")
+        for stage, s in snap["stages"].items():
+            for q in QUANTILES:
+                v = s[f"p{int(q * 100)}_ms"]
+                if v is not None:
+                    lines.append(f'pixkit_stage_seconds{{stage="{stage}",quantile="{q}"}} {v / 1000.0:.9f}')
+            lines.append(f'pixkit_stage_seconds_sum{{stage="{stage}"}} {s["sum_s"]:.9f}')
+            lines.append(f'pixkit_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+    for name, v in snap["counters"].items():
+        m = f"pixkit_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {m} counter")
+        lines.append(f"{m} {v}")
+    typed = set()
+    for key, v in snap["gauges"].items():
+        name, brace, labels = key.partition("{")
+        m = f"pixkit_{_metric_name(name)}"
+        if m not in typed:
+            typed.add(m)
+            lines.append(f"# TYPE {m} gauge")
+        lines.append(f"{m}{brace}{labels} {v}")
+    return "\n".join(lines) + "\n"
+
+
+def serve(port: Optional[int] = None, host: str = "127.0.0.1"):
+    """Serve /metrics in a daemon thread (local only by default). Port from PIXKIT_METRICS_PORT, default 9108."""
+    # Imported here: http.server is costly and only the dashboard process needs it
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # keep stdout quiet
+
+    port = int(port if port is not None else os.getenv("PIXKIT_METRICS_PORT", "9108"))
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
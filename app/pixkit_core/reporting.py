@@ -0,0 +1,121 @@
+# pixkit_core/reporting.py
+"""
+Device-side report-by-exception for telemetry.
+
+A Reporter sees every physics snapshot and decides whether it is worth publishing:
+  - a numeric field moved past its deadband since the last *published* value
+    (fields without a deadband, e.g. status/mode/lights, publish on any change),
+  - but never more often than min_interval_s,
+  - and at least every max_interval_s even when nothing changed (heartbeat).
+So a moving car reports at up to 1/min_interval_s and a parked one drops to a heartbeat.
+
+Published snapshots carry a "report" envelope:
+    {"reason": "first" | "change" | "heartbeat", "n": publish counter,
+     "suppressed": samples skipped since the previous publish, "max_interval_s": ...}
+Receivers use it to tell "unchanged" from "lost": a gap in n is a lost message, and no
+message for longer than max_interval_s means the device or link is gone (see link_state).
+"""
+import os, time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+DEFAULT_DEADBANDS = {
+    "metrics.speed": 0.1,         # km/h
+    "metrics.battery": 0.5,       # %
+    "metrics.temperature": 0.5,   # °C
+    "gps.lat": 1e-5,              # ~1 m
+    "gps.lon": 1e-5,
+}
+
+# Keys that change every sample by construction and never trigger a report
+_VOLATILE = ("seq", "ts", "trace", "report")
+
+
+@dataclass
+class ReportPolicy:
+    deadbands: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_DEADBANDS))
+    min_interval_s: float = 0.2
+    max_interval_s: float = 10.0
+    enabled: bool = True  # False = publish every sample (still stamped with "report")
+
+    @classmethod
+    def from_env(cls) -> "ReportPolicy":
+        return cls(
+            min_interval_s=float(os.getenv("PIXKIT_REPORT_MIN_INTERVAL_S", "0.2")),
+            max_interval_s=float(os.getenv("PIXKIT_REPORT_MAX_INTERVAL_S", "10")),
+            enabled=os.getenv("PIXKIT_REPORT_BY_EXCEPTION", "1").lower() not in ("0", "false", "no", "off"),
+        )
+
+
+def _flatten(msg: Dict, prefix: str = "") -> Dict:
+    out = {}
+    for k, v in msg.items():
+        if not prefix and k in _VOLATILE:
+            continue
+        if isinstance(v, dict):
+            out.update(_flatten(v, f"{prefix}{k}."))
+        else:
+            out[f"{prefix}{k}"] = v
+    return out
+
+
+class Reporter:
+    """Per-device publish decision; offer() returns the message to publish or None."""
+
+    def __init__(self, policy: Optional[ReportPolicy] = None, clock: Callable[[], float] = time.time):
+        self.policy = policy or ReportPolicy()
+        self.clock = clock
+        self._last: Optional[Dict] = None  # flattened last published snapshot
+        self._last_at = 0.0
+        self.published = 0
+        self.suppressed = 0
+
+    def _changed(self, flat: Dict) -> bool:
+        deadbands = self.policy.deadbands
+        for key, value in flat.items():
+            prev = self._last.get(key)
+            band = deadbands.get(key)
+            if band is not None and isinstance(value, (int, float)) and isinstance(prev, (int, float)):
+                if abs(value - prev) > band:
+                    return True
+            elif value != prev:
+                return True
+        return False
+
+    def offer(self, snapshot: Dict) -> Optional[Dict]:
+        now = self.clock()
+        flat = _flatten(snapshot)
+        since = now - self._last_at
+        if self._last is None:
+            reason = "first"
+        elif not self.policy.enabled:
+            reason = "change" if self._changed(flat) else "heartbeat"
+        elif since >= self.policy.max_interval_s:
+            reason = "heartbeat"
+        elif since >= self.policy.min_interval_s and self._changed(flat):
+            reason = "change"
+        else:
+            self.suppressed += 1
+            return None
+        self.published += 1
+        msg = dict(snapshot, report={
+            "reason": reason,
+            "n": self.published,
+            "suppressed": self.suppressed,
+            "max_interval_s": self.policy.max_interval_s,
+        })
+        self._last, self._last_at, self.suppressed = flat, now, 0
+        return msg
+
+
+def link_state(report: Optional[Dict], age_s: float, grace: float = 1.5) -> str:
+    """
+    Receiver view of a device from its last report envelope and that message's age:
+    "live" (recent change), "quiet" (heartbeat: unchanged), "lost" (overdue heartbeat)
+    or "unknown" (sender does not report by exception).
+    """
+    if not report:
+        return "unknown"
+    if age_s > float(report.get("max_interval_s", 0.0)) * grace:
+        return "lost"
+    return "quiet" if report.get("reason") == "heartbeat" else "live"
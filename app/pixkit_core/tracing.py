@@ -0,0 +1,140 @@
+"""
+Command lifecycle tracing.
+
+Each hop appends a (stage, epoch_seconds) mark to meta["trace"]; the list rides
+along with the command and is echoed back in the ack, so the receiving side can
+split end-to-end latency into per-hop segments.
+"""
+import json, threading, time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+from . import metrics
+
+# Canonical stage order
+CONTROLLER_EXECUTE = "controller.execute"
+TRANSPORT_SEND = "transport.send"
+DEVICE_RECEIVE = "device.receive"
+DEVICE_APPLY = "device.apply"
+ACK_PUBLISH = "ack.publish"
+ACK_RECEIVE = "ack.receive"
+
+# Histogram bucket upper bounds (ms); the last bucket is open-ended
+BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+def mark(meta: Dict, stage: str, ts: Optional[float] = None) -> Dict:
+    """Append a span mark to meta['trace'] (created if missing). Returns meta."""
+    meta.setdefault("trace", []).append([stage, time.time() if ts is None else ts])
+    return meta
+
+
+def segments(trace: Iterable) -> List[Dict]:
+    """Durations between consecutive marks: [{'segment': 'a->b', 'start': t0, 'ms': d}, ...]."""
+    marks = list(trace or [])
+    out = []
+    for (s0, t0), (s1, t1) in zip(marks, marks[1:]):
+        out.append({"segment": f"{s0}->{s1}", "start": t0, "ms": (t1 - t0) * 1000.0})
+    return out
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding quantile q (None if empty / open bucket)."""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else None
+        return None
+
+
+class TraceCollector:
+    """
+    Aggregates finished command traces into histograms keyed by
+    (command, segment) and (transport, segment), and keeps the most recent
+    traces for export.
+    """
+
+    def __init__(self, keep: int = 2000):
+        self._lock = threading.Lock()
+        self.by_command: Dict[tuple, Histogram] = {}
+        self.by_transport: Dict[tuple, Histogram] = {}
+        self.recent = deque(maxlen=keep)
+
+    def record(self, correlation_id: str, command: str, transport: str, trace: List) -> List[Dict]:
+        segs = segments(trace)
+        if not segs:
+            return segs
+        total_ms = (trace[-1][1] - trace[0][1]) * 1000.0
+        with self._lock:
+            for s in segs + [{"segment": "total", "ms": total_ms}]:
+                self.by_command.setdefault((command, s["segment"]), Histogram()).add(s["ms"])
+                self.by_transport.setdefault((transport, s["segment"]), Histogram()).add(s["ms"])
+            self.recent.append({
+                "correlation_id": correlation_id,
+                "command": command,
+                "transport": transport,
+                "trace": [list(m) for m in trace],
+            })
+        for s in segs:
+            metrics.observe(f"trace.{s['segment']}", s["ms"] / 1000.0)
+        return segs
+
+    def table(self, by: str = "transport") -> List[Dict]:
+        """Flat rows for display: key, segment, count, mean/p50/p90/p99 (bucket upper bounds, ms)."""
+        src = self.by_transport if by == "transport" else self.by_command
+        with self._lock:
+            items = sorted(src.items())
+        return [{
+            by: key,
+            "segment": seg,
+            "count": h.count,
+            "mean_ms": round(h.sum_ms / h.count, 3) if h.count else None,
+            "p50_ms": h.quantile(0.5),
+            "p90_ms": h.quantile(0.9),
+            "p99_ms": h.quantile(0.99),
+        } for (key, seg), h in items]
+
+    def export_chrome(self, path: str) -> int:
+        """Write recent traces in Chrome trace-event format (chrome://tracing, Perfetto). Returns trace count."""
+        with self._lock:
+            traces = list(self.recent)
+        events = []
+        for tr in traces:
+            for s in segments(tr["trace"]):
+                events.append({
+                    "name": s["segment"],
+                    "cat": tr["command"],
+                    "ph": "X",
+                    "ts": int(s["start"] * 1_000_000),
+                    "dur": int(s["ms"] * 1000),
+                    "pid": tr["transport"],
+                    "tid": tr["correlation_id"],
+                })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(traces)
+
+    def export_jsonl(self, path: str) -> int:
+        """One raw trace per line, for offline analysis (e.g. pandas.read_json(lines=True))."""
+        with self._lock:
+            traces = list(self.recent)
+        with open(path, "w") as f:
+            for tr in traces:
+                f.write(json.dumps(tr) + "\n")
+        return len(traces)
@@ -11,3 +11,7 @@ def clamp(val: float, lo: float, hi: float) -> float:
 def gen_correlation_id() -> str:
     """Simple, sortable correlation ID."""
     return f"{int(time.time()*1000)}-{random.randint(1000,9999)}"
+
+def iso_to_epoch(ts: str) -> float:
+    """Parse a now_iso()-style timestamp back to epoch seconds."""
+    return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
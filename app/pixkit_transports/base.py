@@ -7,15 +7,24 @@ class BaseTransport:
     Transport interface. Implementations must call:
       - on_telemetry(snapshot_dict)
       - on_ack(ack_dict)
+    and may call on_connected() / on_disconnected() on link changes.
+    supersedes_pending is True when a critical command makes the transport itself reject
+    every queued lower-priority action; otherwise PixkitController rejects them.
     """
 
+    supersedes_pending = False
+
     def __init__(self,
                  device_id: str,
                  on_telemetry: Callable[[Dict], None],
-                 on_ack: Callable[[Dict], None]):
+                 on_ack: Callable[[Dict], None],
+                 on_connected: Optional[Callable[[], None]] = None,
+                 on_disconnected: Optional[Callable[[], None]] = None):
         self.device_id = device_id
         self.on_telemetry = on_telemetry
         self.on_ack = on_ack
+        self.on_connected = on_connected or (lambda: None)
+        self.on_disconnected = on_disconnected or (lambda: None)
 
     def connect(self) -> None:
         raise NotImplementedError
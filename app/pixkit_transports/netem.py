@@ -0,0 +1,167 @@
+import math, random
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+# Latency distributions (milliseconds)
+@dataclass
+class Uniform:
+    min_ms: float = 100.0
+    max_ms: float = 800.0
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.uniform(self.min_ms, self.max_ms)
+
+
+@dataclass
+class LogNormal:
+    """Right-skewed latency: median_ms is the 50th percentile, sigma widens the tail."""
+    median_ms: float = 60.0
+    sigma: float = 0.5
+    floor_ms: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        return self.floor_ms + rng.lognormvariate(math.log(max(self.median_ms, 1e-6)), self.sigma)
+
+
+@dataclass
+class Pareto:
+    """Heavy tail: scale_ms minimum, alpha shape (smaller = heavier), capped at cap_ms."""
+    scale_ms: float = 40.0
+    alpha: float = 1.5
+    cap_ms: float = 30_000.0
+
+    def sample(self, rng: random.Random) -> float:
+        return min(self.cap_ms, self.scale_ms * rng.paretovariate(self.alpha))
+
+
+@dataclass
+class GilbertElliott:
+    """
+    Two-state burst-loss channel. Each packet first moves the chain
+    (good->bad with p_gb, bad->good with p_bg), then is lost with the state's loss rate.
+    """
+    p_gb: float = 0.01
+    p_bg: float = 0.3
+    loss_good: float = 0.0
+    loss_bad: float = 0.5
+    bad: bool = False
+
+    def lost(self, rng: random.Random) -> bool:
+        if self.bad:
+            self.bad = rng.random() >= self.p_bg
+        else:
+            self.bad = rng.random() < self.p_gb
+        return rng.random() < (self.loss_bad if self.bad else self.loss_good)
+
+
+@dataclass
+class Link:
+    """
+    One direction of the network.
+    - latency: any object with sample(rng) -> ms
+    - loss: GilbertElliott (burst) or None; plus independent loss_rate
+    - bandwidth_kbps / queue_bytes: serialization delay behind earlier packets,
+      tail-drop when the backlog exceeds queue_bytes (0 = unlimited bandwidth)
+    - duplicate_rate: chance a packet is delivered twice
+    - reorder_rate / reorder_ms: chance a packet is held back an extra reorder_ms
+    """
+    latency: object = field(default_factory=lambda: Uniform(100.0, 800.0))
+    loss: Optional[GilbertElliott] = None
+    loss_rate: float = 0.0
+    bandwidth_kbps: float = 0.0
+    queue_bytes: int = 64_000
+    duplicate_rate: float = 0.0
+    reorder_rate: float = 0.0
+    reorder_ms: float = 200.0
+    _busy_until: float = 0.0
+    # counters
+    sent: int = 0
+    dropped: int = 0
+    duplicated: int = 0
+
+    def transmit(self, size_bytes: int, now: float, rng: random.Random) -> List[float]:
+        """Arrival times (epoch seconds) for one packet: [] if lost, two entries if duplicated."""
+        self.sent += 1
+        start = now
+        if self.bandwidth_kbps > 0:
+            backlog_s = max(0.0, self._busy_until - now)
+            if backlog_s * self.bandwidth_kbps * 125.0 > self.queue_bytes:
+                self.dropped += 1  # tail drop: queue full
+                return []
+            start = max(now, self._busy_until)
+            self._busy_until = start + size_bytes / (self.bandwidth_kbps * 125.0)
+            start = self._busy_until
+        if (self.loss is not None and self.loss.lost(rng)) or rng.random() < self.loss_rate:
+            self.dropped += 1
+            return []
+        arrivals = [start + self._delay(rng)]
+        if rng.random() < self.duplicate_rate:
+            self.duplicated += 1
+            arrivals.append(start + self._delay(rng))
+        return arrivals
+
+    def _delay(self, rng: random.Random) -> float:
+        ms = self.latency.sample(rng)
+        if rng.random() < self.reorder_rate:
+            ms += self.reorder_ms
+        return ms / 1000.0
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "dropped": self.dropped, "duplicated": self.duplicated,
+                "loss_pct": round(100.0 * self.dropped / self.sent, 2) if self.sent else 0.0}
+
+
+class NetworkModel:
+    """
+    Seedable, asymmetric network between controller and device.
+    uplink carries commands to the device; downlink carries acks and telemetry back.
+    """
+
+    def __init__(self, uplink: Optional[Link] = None, downlink: Optional[Link] = None, seed: Optional[int] = None):
+        self.uplink = uplink or Link()
+        self.downlink = downlink or Link()
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def send_up(self, size_bytes: int, now: float) -> List[float]:
+        return self.uplink.transmit(size_bytes, now, self.rng)
+
+    def send_down(self, size_bytes: int, now: float) -> List[float]:
+        return self.downlink.transmit(size_bytes, now, self.rng)
+
+    def stats(self) -> dict:
+        return {"uplink": self.uplink.stats(), "downlink": self.downlink.stats()}
+
+
+def _lte() -> NetworkModel:
+    return NetworkModel(
+        uplink=Link(LogNormal(45, 0.35, floor_ms=15), bandwidth_kbps=5_000),
+        downlink=Link(LogNormal(35, 0.35, floor_ms=10), bandwidth_kbps=20_000),
+    )
+
+
+def _degraded_cellular() -> NetworkModel:
+    return NetworkModel(
+        uplink=Link(Pareto(80, 1.6, cap_ms=8_000), loss=GilbertElliott(0.02, 0.25, 0.0, 0.4),
+                    bandwidth_kbps=256, queue_bytes=16_000, reorder_rate=0.05, reorder_ms=400),
+        downlink=Link(Pareto(60, 1.4, cap_ms=8_000), loss=GilbertElliott(0.03, 0.2, 0.01, 0.6),
+                      bandwidth_kbps=512, queue_bytes=32_000, duplicate_rate=0.02, reorder_rate=0.1, reorder_ms=500),
+    )
+
+
+PRESETS = {
+    "lan": lambda: NetworkModel(Link(Uniform(1, 5)), Link(Uniform(1, 5))),
+    "wifi": lambda: NetworkModel(Link(LogNormal(8, 0.6, floor_ms=2), loss_rate=0.002),
+                                 Link(LogNormal(8, 0.6, floor_ms=2), loss_rate=0.002)),
+    "lte": _lte,
+    "degraded_cellular": _degraded_cellular,
+}
+
+
+def from_preset(name: str, seed: Optional[int] = None) -> NetworkModel:
+    if name not in PRESETS:
+        raise ValueError(f"Unknown network preset {name!r}; available: {', '.join(PRESETS)}")
+    model = PRESETS[name]()
+    model.seed, model.rng = seed, random.Random(seed)
+    return model
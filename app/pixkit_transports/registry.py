@@ -0,0 +1,53 @@
+import importlib, os, time
+from typing import Dict, Optional, Type
+from pixkit_core import metrics
+from pixkit_transports.base import BaseTransport
+
+# name -> "module:Class"; modules are imported only when that transport is first requested
+_REGISTRY: Dict[str, str] = {
+    "sim": "pixkit_transports.sim:SimTransport",
+    "replay": "pixkit_transports.replay:ReplayTransport",
+    "mqtt": "connections.transport_mqtt:PixkitMqttClient",
+    "ws": "connections.transport_ws:PixkitWsClient",
+}
+_loaded: Dict[str, Type[BaseTransport]] = {}
+import_times_ms: Dict[str, float] = {}
+
+
+def register(name: str, target: str) -> None:
+    """Register (or override) a transport as 'package.module:ClassName'."""
+    _REGISTRY[name.lower()] = target
+    _loaded.pop(name.lower(), None)
+
+
+def available():
+    return sorted(_REGISTRY)
+
+
+def default_name() -> str:
+    return os.getenv("PIXKIT_TRANSPORT", "sim").lower()
+
+
+def get_transport_class(name: Optional[str] = None) -> Type[BaseTransport]:
+    """Resolve a transport class, importing its module on first use."""
+    name = (name or default_name()).lower()
+    cls = _loaded.get(name)
+    if cls is not None:
+        return cls
+    if name not in _REGISTRY:
+        raise ValueError(f"Unknown transport {name!r}; available: {', '.join(available())}")
+    module_name, _, attr = _REGISTRY[name].partition(":")
+    t0 = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_times_ms[name] = (time.perf_counter() - t0) * 1000.0
+    metrics.observe(f"import.transport.{name}", import_times_ms[name] / 1000.0)
+    cls = getattr(module, attr)
+    if not issubclass(cls, BaseTransport):
+        raise TypeError(f"{_REGISTRY[name]} does not implement BaseTransport")
+    _loaded[name] = cls
+    return cls
+
+
+def create_transport(name: Optional[str] = None, **kwargs) -> BaseTransport:
+    """Instantiate the selected transport (default: $PIXKIT_TRANSPORT)."""
+    return get_transport_class(name)(**kwargs)
@@ -0,0 +1,207 @@
+import threading, time
+from typing import Callable, Dict, List, Optional, Tuple
+from pixkit_core import metrics
+
+
+class ReorderBuffer:
+    """
+    Per-stream resequencer over a small bounded window.
+    - In-order messages pass straight through.
+    - Early messages are held (at most `window`, and at most max_hold_s) waiting for the gap to fill.
+    - Anything at or below the last released seq is a duplicate/late copy and is dropped.
+    - When the window overflows or the hold expires, the gap is declared lost and skipped.
+    - A device restart (seq counter reset) resyncs the stream: detected by a "first" report
+      envelope, a newer device ts with a lower seq, or a backward jump beyond the window.
+    Each push is O(1) amortized.
+    """
+
+    __slots__ = ("window", "max_hold_s", "next_seq", "last_ts", "held", "held_since",
+                 "received", "delivered", "duplicates", "reordered", "lost", "gaps", "restarts")
+
+    def __init__(self, window: int = 8, max_hold_s: float = 2.0):
+        self.window = window
+        self.max_hold_s = max_hold_s
+        self.next_seq: Optional[int] = None
+        self.last_ts = ""  # newest device ts seen on this stream
+        self.held: Dict[int, Dict] = {}
+        self.held_since = 0.0
+        self.received = self.delivered = self.duplicates = self.reordered = self.lost = self.gaps = 0
+        self.restarts = 0
+
+    def _restarted(self, seq: int, msg: Dict) -> bool:
+        if seq >= self.next_seq:
+            return False
+        if (msg.get("report") or {}).get("reason") == "first":
+            return True
+        ts = msg.get("ts") or ""
+        # Late copies carry an older (or equal, at the device's ts resolution) timestamp
+        return ts > self.last_ts or (ts == self.last_ts and self.next_seq - seq > self.window)
+
+    def push(self, seq: int, msg: Dict, now: float) -> List[Dict]:
+        self.received += 1
+        if self.next_seq is None or self._restarted(seq, msg):
+            if self.next_seq is not None:
+                self.restarts += 1
+            # Anything still held belongs to the previous run; hand it over before resyncing
+            out = [self.held[s] for s in sorted(self.held)]
+            self.next_seq, self.held = seq, {}
+        else:
+            out = []
+        if seq < self.next_seq or seq in self.held:
+            self.duplicates += 1
+            self.delivered += len(out)
+            return out
+        self.last_ts = max(self.last_ts, msg.get("ts") or "")
+        if seq == self.next_seq:
+            out.append(msg)
+            self.next_seq += 1
+            out.extend(self._release(now))
+        else:
+            if not self.held:
+                self.held_since = now
+            self.held[seq] = msg
+        out.extend(self.expire(now))
+        self.delivered += len(out)
+        return out
+
+    def _release(self, now: float) -> List[Dict]:
+        out = []
+        while self.next_seq in self.held:
+            out.append(self.held.pop(self.next_seq))
+            self.next_seq += 1
+            self.reordered += 1
+        if out and self.held:
+            self.held_since = now  # remaining holds start a fresh wait
+        return out
+
+    def expire(self, now: float) -> List[Dict]:
+        """Skip the gap if the window is full or the oldest hold has timed out."""
+        out = []
+        while self.held and (len(self.held) >= self.window
+                             or max(self.held) - self.next_seq >= self.window
+                             or now - self.held_since >= self.max_hold_s):
+            first = min(self.held)
+            self.lost += first - self.next_seq
+            self.gaps += 1
+            self.next_seq = first
+            out.extend(self._release(now))
+        return out
+
+    def stats(self) -> Dict:
+        seen = self.delivered + self.lost
+        return {
+            "received": self.received,
+            "delivered": self.delivered,
+            "duplicates": self.duplicates,
+            "reordered": self.reordered,
+            "lost": self.lost,
+            "gaps": self.gaps,
+            "restarts": self.restarts,
+            "held": len(self.held),
+            "loss_rate": self.lost / seen if seen else 0.0,
+            "duplicate_rate": self.duplicates / self.received if self.received else 0.0,
+        }
+
+
+class Resequencer:
+    """
+    Receive-side sequencing for a transport: one ReorderBuffer per (deviceId, type),
+    since status and telemetry carry independent seq streams.
+    Without deliver, push() returns the messages now deliverable, in seq order.
+    With deliver, every release goes through it under the sequencer lock (push() returns []),
+    and a timer also releases timed-out holds when no further message arrives, so a
+    heartbeat-only stream is not held past max_hold_s. Both paths share one lock, so a timer
+    release can never overtake messages released by a concurrent push().
+    """
+
+    def __init__(self, window: int = 8, max_hold_s: float = 2.0, name: str = "rx",
+                 deliver: Optional[Callable[[Dict], None]] = None):
+        self.window = window
+        self.max_hold_s = max_hold_s
+        self.name = name
+        self.deliver = deliver
+        self.streams: Dict[Tuple, ReorderBuffer] = {}
+        self._holding: Dict[Tuple, ReorderBuffer] = {}
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+    def push(self, msg: Dict) -> List[Dict]:
+        seq = msg.get("seq")
+        with self._lock:
+            now = time.monotonic()
+            out = self.expire(now)
+            if not isinstance(seq, int):
+                out.append(msg)
+                return self._deliver(out)
+            key = (msg.get("deviceId"), msg.get("type", "telemetry"))
+            buf = self.streams.get(key)
+            if buf is None:
+                buf = self.streams[key] = ReorderBuffer(self.window, self.max_hold_s)
+            before = (buf.duplicates, buf.lost, buf.reordered)
+            out.extend(buf.push(seq, msg, now))
+            if buf.held:
+                self._holding[key] = buf
+            else:
+                self._holding.pop(key, None)
+            self._count(buf, before)
+            self._schedule()
+            return self._deliver(out)
+
+    def _deliver(self, out: List[Dict]) -> List[Dict]:
+        """Hand released messages to deliver in order (caller holds the lock), or return them."""
+        if self.deliver is None:
+            return out
+        for m in out:
+            self.deliver(m)
+        return []
+
+    def expire(self, now: Optional[float] = None) -> List[Dict]:
+        """Release holds that timed out on any stream (cheap: only streams currently holding)."""
+        with self._lock:
+            if not self._holding:
+                return []
+            now = time.monotonic() if now is None else now
+            out = []
+            for key, buf in list(self._holding.items()):
+                if now - buf.held_since >= buf.max_hold_s:
+                    before = (buf.duplicates, buf.lost, buf.reordered)
+                    released = buf.expire(now)
+                    buf.delivered += len(released)
+                    out.extend(released)
+                    self._count(buf, before)
+                    if not buf.held:
+                        del self._holding[key]
+            return out
+
+    def _schedule(self) -> None:
+        """Arm the expiry timer for the earliest hold deadline (caller holds the lock)."""
+        if self.deliver is None or not self._holding or self._timer is not None:
+            return
+        due = min(b.held_since + b.max_hold_s for b in self._holding.values()) - time.monotonic()
+        self._timer = threading.Timer(max(0.0, due), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._deliver(self.expire())
+            self._schedule()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _count(self, buf: ReorderBuffer, before: Tuple[int, int, int]) -> None:
+        dup, lost, reord = buf.duplicates - before[0], buf.lost - before[1], buf.reordered - before[2]
+        if dup:
+            metrics.incr(f"{self.name}.duplicates", dup)
+        if lost:
+            metrics.incr(f"{self.name}.lost", lost)
+        if reord:
+            metrics.incr(f"{self.name}.reordered", reord)
+
+    def stats(self) -> Dict:
+        return {f"{d}/{t}": b.stats() for (d, t), b in self.streams.items()}
@@ -0,0 +1,215 @@
+import json, mmap, os, struct, threading, time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from pixkit_core import metrics
+from pixkit_transports.base import BaseTransport
+
+# Log layout: MAGIC, then records of  <ts:f64><kind:u8><len:u32><json payload>
+# Index layout (<log>.idx): entries of  <ts:f64><offset:u64>, one per record
+MAGIC = b"PXKREC1\n"
+REC_HEADER = struct.Struct("<dBI")
+IDX_ENTRY = struct.Struct("<dQ")
+KIND_TELEMETRY, KIND_ACK = 0, 1
+
+
+class Recorder:
+    """
+    Append-only binary recorder for telemetry and ack messages.
+    attach() taps a transport's callbacks so every message is logged before it is delivered.
+    Writes may come from a network thread; the file is flushed at least every flush_interval_s.
+    """
+
+    def __init__(self, path: str, flush_interval_s: float = 1.0):
+        self.path = path
+        self.flush_interval_s = flush_interval_s
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+        fresh = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._log = open(path, "ab")
+        self._idx = open(path + ".idx", "ab")
+        if fresh:
+            self._log.write(MAGIC)
+        self._offset = self._log.tell()
+        self.count = 0
+
+    def write(self, kind: int, msg: Dict, ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        with metrics.timer("recorder.encode"):
+            payload = json.dumps(msg, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._log.write(REC_HEADER.pack(ts, kind, len(payload)))
+            self._log.write(payload)
+            self._idx.write(IDX_ENTRY.pack(ts, self._offset))
+            self._offset += REC_HEADER.size + len(payload)
+            self.count += 1
+            if time.monotonic() - self._flushed_at >= self.flush_interval_s:
+                self._flush()
+
+    def attach(self, transport) -> None:
+        on_telemetry, on_ack = transport.on_telemetry, transport.on_ack
+
+        def rec_telemetry(msg):
+            self.write(KIND_TELEMETRY, msg)
+            on_telemetry(msg)
+
+        def rec_ack(ack):
+            self.write(KIND_ACK, ack)
+            on_ack(ack)
+
+        transport.on_telemetry = rec_telemetry
+        transport.on_ack = rec_ack
+
+    def _flush(self) -> None:
+        self._log.flush()
+        self._idx.flush()
+        self._flushed_at = time.monotonic()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._log.close()
+            self._idx.close()
+
+
+class RecordLog:
+    """Read-only, memory-mapped view of a recording plus its (ts, offset) index."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a pixkit recording")
+        self._index = self._load_index()
+
+    def _load_index(self) -> bytes:
+        idx_path = self.path + ".idx"
+        if os.path.exists(idx_path):
+            with open(idx_path, "rb") as f:
+                data = f.read()
+            return data[:len(data) - len(data) % IDX_ENTRY.size]
+        # No index (e.g. copied log only): rebuild once with a header-only walk
+        out = bytearray()
+        off, end = len(MAGIC), len(self._mm)
+        while off + REC_HEADER.size <= end:
+            ts, _, n = REC_HEADER.unpack_from(self._mm, off)
+            out += IDX_ENTRY.pack(ts, off)
+            off += REC_HEADER.size + n
+        return bytes(out)
+
+    def __len__(self) -> int:
+        return len(self._index) // IDX_ENTRY.size
+
+    def entry(self, i: int) -> Tuple[float, int]:
+        return IDX_ENTRY.unpack_from(self._index, i * IDX_ENTRY.size)
+
+    def ts(self, i: int) -> float:
+        return self.entry(i)[0]
+
+    def seek(self, ts: float) -> int:
+        """Position of the first record at or after ts (binary search over the index)."""
+        return bisect_left(range(len(self)), ts, key=self.ts)
+
+    def read(self, i: int) -> Tuple[float, int, Dict]:
+        _, off = self.entry(i)
+        ts, kind, n = REC_HEADER.unpack_from(self._mm, off)
+        start = off + REC_HEADER.size
+        return ts, kind, json.loads(self._mm[start:start + n])
+
+    def iter_from(self, i: int = 0) -> Iterator[Tuple[float, int, Dict]]:
+        for j in range(i, len(self)):
+            yield self.read(j)
+
+    def close(self) -> None:
+        self._mm.close()
+        self._f.close()
+
+
+class ReplayTransport(BaseTransport):
+    """
+    Replays a Recorder log through the normal transport callbacks.
+    - speed: 1.0 real time, N for N× faster, 0 for as fast as possible (default: $PIXKIT_REPLAY_SPEED or 1).
+    - tick() emits every record whose replay time has come; run() plays to the end.
+    - Commands are accepted and counted but do not alter the recorded stream.
+    """
+
+    def __init__(self,
+                 device_id: str,
+                 on_telemetry: Callable[[Dict], None],
+                 on_ack: Callable[[Dict], None],
+                 path: Optional[str] = None,
+                 speed: Optional[float] = None,
+                 loop: bool = False,
+                 max_batch: int = 10_000,
+                 **kwargs):
+        super().__init__(device_id, on_telemetry, on_ack, **kwargs)
+        self.path = path or os.getenv("PIXKIT_REPLAY_PATH", "pixkit_recording.bin")
+        self.speed = float(os.getenv("PIXKIT_REPLAY_SPEED", "1")) if speed is None else speed
+        self.loop = loop
+        self.max_batch = max_batch
+        self.commands_ignored = 0
+        self.log: Optional[RecordLog] = None
+        self._pos = 0
+        self._wall0 = 0.0
+        self._log0 = 0.0
+
+    def connect(self) -> None:
+        self.log = RecordLog(self.path)
+        self.seek(self.log.ts(0) if len(self.log) else 0.0)
+        self.on_connected()
+
+    def disconnect(self) -> None:
+        if self.log:
+            self.log.close()
+            self.log = None
+            self.on_disconnected()
+
+    def send_command(self, command: str, params: Optional[Dict] = None, meta: Optional[Dict] = None) -> None:
+        self.commands_ignored += 1
+
+    def seek(self, ts: float) -> None:
+        """Jump to the first record at or after log time ts and restart the replay clock there."""
+        self._pos = self.log.seek(ts)
+        self._log0 = ts
+        self._wall0 = time.monotonic()
+
+    @property
+    def done(self) -> bool:
+        return self.log is None or (self._pos >= len(self.log) and not self.loop)
+
+    def _deliver(self, kind: int, msg: Dict) -> None:
+        if self.device_id not in ("", "*") and msg.get("deviceId", self.device_id) != self.device_id:
+            return
+        if kind == KIND_ACK:
+            self.on_ack(msg)
+        else:
+            self.on_telemetry(msg)
+
+    def tick(self, **kwargs) -> int:
+        """Emit all records due by now (at most max_batch). Returns how many were emitted."""
+        if self.log is None:
+            self.connect()
+        n = len(self.log)
+        if self._pos >= n and self.loop and n:
+            self.seek(self.log.ts(0))
+        horizon = float("inf") if not self.speed else self._log0 + (time.monotonic() - self._wall0) * self.speed
+        emitted = 0
+        while self._pos < n and emitted < self.max_batch:
+            ts, kind, msg = self.log.read(self._pos)
+            if ts > horizon:
+                break
+            self._deliver(kind, msg)
+            self._pos += 1
+            emitted += 1
+        metrics.incr("replay.records", emitted)
+        return emitted
+
+    def run(self, poll_s: float = 0.005) -> None:
+        """Play to the end of the log (blocking); use from a worker thread or headless load test."""
+        while not self.done:
+            if not self.tick() and self.speed:
+                time.sleep(poll_s)
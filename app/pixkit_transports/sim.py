@@ -1,11 +1,15 @@
 
 # pixkit_transports/sim.py
-import time, random
-from typing import Dict, Optional
+import heapq, itertools, json, time, random
+from typing import Callable, Dict, Optional
 from dataclasses import dataclass
-from pixkit_core.car import Car
+from pixkit_core.car import Car, STEP_S
 from pixkit_core.utils import now_iso
-from pixkit_core.events import Ack
+from pixkit_core.events import Ack, CONTROL, CRITICAL, PRIORITY_NAMES
+from pixkit_core import metrics, tracing
+from pixkit_core.reporting import Reporter, ReportPolicy
+from pixkit_transports.base import BaseTransport
+from pixkit_transports.netem import NetworkModel
 
 @dataclass
 class MockPolicy:
@@ -13,31 +17,60 @@ class MockPolicy:
     min_latency_ms: int = 100
     max_latency_ms: int = 800
     failure_rate: float = 0.0  # 0..1 proportion of actions that fail
+    max_per_tick: int = 0      # device throughput: non-critical actions completed per tick (0 = unlimited)
 
-class SimTransport:
+class SimTransport(BaseTransport):
     """
     Local simulation transport using the OO Car class.
     - Queues actions with a scheduled completion time.
     - Applies state changes at completion (success), then emits ack.
     - Emits failure acks without applying changes (to test error UX).
+    - One queue per priority lane (meta["priority"]); due actions complete most-urgent lane first.
+      Critical actions skip the queue (min latency, not throttled by max_per_tick) and
+      supersede every pending lower-priority action with a rejected ack.
+    - With a NetworkModel (set_network), commands cross the uplink and acks/telemetry the
+      downlink, picking up its latency, loss, duplication, reordering and bandwidth limits;
+      without one, MockPolicy latency applies and delivery back is immediate.
+    - Snapshots go through a Reporter (report-by-exception with heartbeat; PIXKIT_REPORT_*),
+      so not every tick emits telemetry.
+    - All scheduling reads `clock` (default time.time), so a virtual clock can drive it headless.
     """
 
+    supersedes_pending = True
+
     def __init__(self,
                  device_id: str,
                  on_telemetry,
-                 on_ack):
-        self.device_id = device_id
-        self.on_telemetry = on_telemetry
-        self.on_ack = on_ack
+                 on_ack,
+                 clock: Callable[[], float] = time.time,
+                 **kwargs):
+        super().__init__(device_id, on_telemetry, on_ack, **kwargs)
+        self.clock = clock
+        self.reporter = Reporter(ReportPolicy.from_env(), clock=clock)
         self.car = Car(device_id=device_id)
         self.policy = MockPolicy()
-        self._pending = []  # list of dicts: {cmd, params, meta, complete_at, will_fail}
+        # priority -> heap of (complete_at, n, action dict {cmd, params, meta, complete_at, will_fail})
+        self._lanes: Dict[int, list] = {}
+        self._n = itertools.count()
+        self.network: Optional[NetworkModel] = None
+        self._outbox = []  # downlink heap of (deliver_at, n, kind, payload)
+
+    @property
+    def pending_count(self) -> int:
+        return sum(len(q) for q in self._lanes.values())
 
     def set_policy(self, policy: MockPolicy) -> None:
         self.policy = policy
 
+    def set_network(self, network: Optional[NetworkModel]) -> None:
+        """Route traffic through a network model (None restores MockPolicy-only behavior)."""
+        self.network = network
+
+    def set_reporting(self, policy: ReportPolicy) -> None:
+        self.reporter = Reporter(policy, clock=self.clock)
+
     def connect(self) -> None:
-        pass  # no-op
+        self.on_connected()  # always "connected"
 
     def disconnect(self) -> None:
         pass  # no-op
@@ -45,16 +78,41 @@ class SimTransport:
     def send_command(self, command: str, params: Optional[Dict] = None, meta: Optional[Dict] = None) -> None:
         params = params or {}
         meta = meta or {}
+        priority = int(meta.get("priority", CONTROL))
         # Decide latency and failure
-        latency_ms = random.randint(self.policy.min_latency_ms, self.policy.max_latency_ms)
+        if priority == CRITICAL:
+            latency_ms = self.policy.min_latency_ms
+        else:
+            latency_ms = random.randint(self.policy.min_latency_ms, self.policy.max_latency_ms)
         will_fail = random.random() < float(self.policy.failure_rate)
-        self._pending.append({
-            "cmd": command,
-            "params": params,
-            "meta": meta,
-            "complete_at": time.time() + latency_ms / 1000.0,
-            "will_fail": will_fail,
-        })
+        tracing.mark(meta, tracing.TRANSPORT_SEND)
+        if priority == CRITICAL:
+            self._supersede(command)
+        now = self.clock()
+        if self.network is None:
+            arrivals = [now + latency_ms / 1000.0]
+        else:
+            size = len(json.dumps({"command": command, "params": params, "meta": meta}))
+            arrivals = self.network.send_up(size, now)
+            if not arrivals:
+                metrics.incr("sim.net.commands_lost")
+        for i, at in enumerate(arrivals):  # 0 = lost on the uplink, 2 = duplicated
+            action = {
+                "cmd": command,
+                "params": params,
+                "meta": meta if i == 0 else dict(meta, trace=list(meta.get("trace", []))),
+                "complete_at": at,
+                "will_fail": will_fail,
+            }
+            heapq.heappush(self._lanes.setdefault(priority, []), (at, next(self._n), action))
+
+    def _supersede(self, by_command: str) -> None:
+        """Cancel all queued lower-priority actions (rejected ack, no state change)."""
+        for priority in sorted(p for p in self._lanes if p > CRITICAL):
+            lane, self._lanes[priority] = self._lanes[priority], []
+            for _, _, a in sorted(lane):
+                metrics.incr(f"sim.superseded.{PRIORITY_NAMES.get(priority, priority)}")
+                self._emit_ack(a, accepted=False, message=f"Superseded by {by_command}")
 
     def _apply_command(self, command: str, params: Dict) -> None:
         """Apply state change (only on success)."""
@@ -81,6 +139,7 @@ class SimTransport:
 
     def _emit_ack(self, action: Dict, accepted: bool, message: str) -> None:
         meta = action["meta"]
+        tracing.mark(meta, tracing.ACK_PUBLISH)
         ack = Ack(
             correlation_id=meta.get("correlationId", ""),
             command=action["cmd"],
@@ -96,23 +155,73 @@ class SimTransport:
                 "lights": self.car.lights,
                 "firmware": self.car.firmware,
             },
+            trace=meta.get("trace", []),
         )
-        self.on_ack(ack.__dict__)
+        self._send_down("ack", ack.__dict__)
+
+    def _send_down(self, kind: str, payload: Dict) -> None:
+        if self.network is None:
+            self._deliver(kind, payload)
+            return
+        arrivals = self.network.send_down(len(json.dumps(payload)), self.clock())
+        if not arrivals:
+            metrics.incr(f"sim.net.{kind}_lost")
+        for i, at in enumerate(arrivals):
+            msg = payload if i == 0 else dict(payload, trace=list(payload.get("trace", [])))
+            heapq.heappush(self._outbox, (at, next(self._n), kind, msg))
+
+    def _deliver(self, kind: str, payload: Dict) -> None:
+        if kind == "ack":
+            tracing.mark(payload, tracing.ACK_RECEIVE)
+            with metrics.timer("sim.dispatch_ack"):
+                self.on_ack(payload)
+        else:
+            with metrics.timer("sim.dispatch_telemetry"):
+                self.on_telemetry(payload)
 
-    def tick(self, noise_level: float = 0.1) -> None:
-        """Advance physics and complete any due actions."""
+    @metrics.timed("sim.tick")
+    def tick(self, noise_level: float = 0.1, dt: Optional[float] = None) -> None:
+        """Advance physics (by dt simulated seconds; default one Car step) and complete any due actions."""
         # Physics → telemetry emission
-        snapshot = self.car.step(noise_level=noise_level)
-        self.on_telemetry(snapshot)
+        snapshot = self.reporter.offer(self.car.step(noise_level=noise_level, dt=STEP_S if dt is None else dt))
+        if snapshot is None:
+            metrics.incr("sim.telemetry_suppressed")
+        else:
+            self._send_down("telemetry", snapshot)
+        self.pump()
 
-        # Complete due actions
-        now = time.time()
-        due = [a for a in self._pending if a["complete_at"] <= now]
-        self._pending = [a for a in self._pending if a["complete_at"] > now]
+    def next_due(self) -> Optional[float]:
+        """Earliest time an action completes or downlink traffic arrives (None if idle)."""
+        heads = [lane[0][0] for lane in self._lanes.values() if lane]
+        if self._outbox:
+            heads.append(self._outbox[0][0])
+        return min(heads, default=None)
+
+    def pump(self) -> None:
+        """Complete due actions and deliver arrived traffic, without a physics step."""
+        # Complete due actions, most urgent lane first
+        now = self.clock()
+        budget = self.policy.max_per_tick or float("inf")
+        due = []
+        for priority in sorted(self._lanes):
+            lane = self._lanes[priority]
+            while lane and lane[0][0] <= now and (priority == CRITICAL or budget > 0):
+                due.append(heapq.heappop(lane)[2])
+                if priority != CRITICAL:
+                    budget -= 1
+        metrics.gauge("sim.pending", self.pending_count, device=self.device_id)
 
         for a in due:
+            tracing.mark(a["meta"], tracing.DEVICE_RECEIVE)
             if a["will_fail"]:
                 self._emit_ack(a, accepted=False, message="Simulated failure")
             else:
                 self._apply_command(a["cmd"], a["params"])
+                tracing.mark(a["meta"], tracing.DEVICE_APPLY)
                 self._emit_ack(a, accepted=True, message="OK")
+
+        # Deliver downlink traffic that has arrived (may be out of order / duplicated)
+        now = self.clock()
+        while self._outbox and self._outbox[0][0] <= now:
+            _, _, kind, payload = heapq.heappop(self._outbox)
+            self._deliver(kind, payload)
@@ -1,8 +1,10 @@
 
 # services/controller.py
-from typing import Dict, Optional
+import time, dataclasses
+from typing import Dict, List, Optional, Tuple
 from pixkit_core.utils import gen_correlation_id, now_iso
-from pixkit_core.events import Action
+from pixkit_core.events import Ack, Action, CONTROL, CRITICAL, priority_for
+from pixkit_core import tracing
 
 class PixkitController:
     """
@@ -10,34 +12,106 @@ class PixkitController:
     Ready for swapping transports (sim, mqtt, ws, rest).
     """
 
-    def __init__(self, transport):
+    def __init__(self, transport, use_priorities: bool = True):
         self.transport = transport
+        self.use_priorities = use_priorities  # False: every command rides the control lane (FIFO)
         self.pending: Dict[str, Action] = {}
+        self._sent_at: Dict[str, float] = {}  # corr -> monotonic send time, for expiry
+        self.traces = tracing.TraceCollector()
+        self.mock_policy: Optional[Tuple[int, int, float]] = None  # last applied (min_ms, max_ms, failure_rate)
+        self.network_model: Tuple[Optional[str], Optional[int]] = (None, None)  # last applied (preset, seed)
 
     def set_mock_policy(self, min_ms: int, max_ms: int, failure_rate: float) -> None:
-        """Update simulation policy (latency & failure rate) if supported."""
+        """Update simulation policy (latency & failure rate) if supported; other fields are kept."""
+        self.mock_policy = (int(min_ms), int(max_ms), float(failure_rate))
         if hasattr(self.transport, "set_policy"):
             from pixkit_transports.sim import MockPolicy
-            self.transport.set_policy(MockPolicy(min_ms, max_ms, failure_rate))
+            policy = getattr(self.transport, "policy", None) or MockPolicy()
+            self.transport.set_policy(dataclasses.replace(
+                policy, min_latency_ms=int(min_ms), max_latency_ms=int(max_ms), failure_rate=float(failure_rate)))
 
-    def execute(self, command: str, params: Optional[Dict] = None, requested_by: str = "local") -> str:
-        """Create an Action, push to transport, return correlation_id."""
+    def set_network_model(self, preset: Optional[str], seed: Optional[int] = None) -> None:
+        """Select a pixkit_transports.netem preset (None = off) if the transport supports it."""
+        self.network_model = (preset, seed)
+        if hasattr(self.transport, "set_network"):
+            from pixkit_transports.netem import from_preset
+            self.transport.set_network(from_preset(preset, seed) if preset else None)
+
+    def execute(self, command: str, params: Optional[Dict] = None, requested_by: str = "local",
+                priority: Optional[int] = None) -> str:
+        """Create an Action, push to transport, return correlation_id.
+        priority defaults to the command's lane (pixkit_core.events.COMMAND_PRIORITY).
+        A critical command supersedes every pending lower-priority action (see supersede_pending)."""
         params = params or {}
         corr = gen_correlation_id()
+        if priority is None:
+            priority = priority_for(command) if self.use_priorities else CONTROL
         action = Action(
             correlation_id=corr,
             command=command,
             params=params,
             requested_by=requested_by,
             ts_start=now_iso(),
+            priority=priority,
         )
         self.pending[corr] = action
-        # send with metadata (corr id + requested_by + ts_start)
-        self.transport.send_command(command, params, meta={"correlationId": corr, "requestedBy": requested_by, "ts_start": action.ts_start})
+        self._sent_at[corr] = time.monotonic()
+        # send with metadata (corr id + requested_by + ts_start + span marks)
+        meta = {"correlationId": corr, "requestedBy": requested_by, "ts_start": action.ts_start, "priority": priority}
+        tracing.mark(meta, tracing.CONTROLLER_EXECUTE)
+        if priority == CRITICAL and not getattr(self.transport, "supersedes_pending", False):
+            self.supersede_pending(command, exclude=corr)
+        self.transport.send_command(command, params, meta=meta)
         return corr
 
+    def supersede_pending(self, by_command: str, exclude: str = "") -> List[Action]:
+        """
+        Reject every pending action below critical priority: each gets a rejected ack
+        ("Superseded by <command>") through the transport's on_ack, like SimTransport's own
+        supersede, and is then cleared, so a late device ack no longer matches a pending action.
+        """
+        superseded = [a for corr, a in list(self.pending.items()) if corr != exclude and a.priority > CRITICAL]
+        for action in superseded:
+            self.transport.on_ack(Ack(
+                correlation_id=action.correlation_id,
+                command=action.command,
+                accepted=False,
+                message=f"Superseded by {by_command}",
+                ts_end=now_iso(),
+                result={},
+            ).__dict__)
+            self.clear_action(action.correlation_id)
+        return superseded
+
+    def record_ack(self, ack: Dict):
+        """Feed an ack's span marks into the trace histograms. Returns the per-hop segments."""
+        corr = ack.get("correlation_id") or ack.get("correlationId") or ""
+        action = self.pending.get(corr)
+        command = ack.get("command") or (action.command if action else "unknown")
+        return self.traces.record(corr, command, type(self.transport).__name__, ack.get("trace") or [])
+
     def get_action(self, correlation_id: str) -> Optional[Action]:
         return self.pending.get(correlation_id)
 
+    def elapsed_ms(self, correlation_id: str) -> Optional[float]:
+        """Milliseconds since a pending action was sent (monotonic clock), or None if not pending."""
+        sent = self._sent_at.get(correlation_id)
+        return None if sent is None else (time.monotonic() - sent) * 1000.0
+
     def clear_action(self, correlation_id: str) -> None:
         self.pending.pop(correlation_id, None)
+        self._sent_at.pop(correlation_id, None)
+
+    def expire_pending(self, timeout_s: float) -> List[Action]:
+        """Drop and return actions whose ack has not arrived within timeout_s (lost acks)."""
+        cutoff = time.monotonic() - timeout_s
+        expired = []
+        # dicts keep insertion order, so the oldest sends come first
+        for corr, sent in list(self._sent_at.items()):
+            if sent > cutoff:
+                break
+            action = self.pending.pop(corr, None)
+            del self._sent_at[corr]
+            if action:
+                expired.append(action)
+        return expired
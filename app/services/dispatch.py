@@ -0,0 +1,139 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+from pixkit_core import metrics
+
+POLICIES = ("block", "drop_oldest", "conflate")
+PULL_BLOCK_TIMEOUT_S = 0.5  # pull-mode "block" default: an owner that stops draining must not stall the producer
+
+
+class Dispatcher:
+    """
+    Bounded hand-off between a transport's network thread and a consumer.
+    Policies when the queue is full:
+      - block:        producer waits (up to block_timeout_s, then the new message is dropped)
+      - drop_oldest:  evict the oldest queued message
+      - conflate:     keep only the latest message per (deviceId, type); a new key evicts the oldest key
+    Push mode: pass a consumer and call start(); a worker thread delivers messages.
+    Pull mode: no consumer; the owner calls drain() (e.g. once per Streamlit rerun).
+      The owner may go away without notice, so "block" never waits forever here
+      (block_timeout_s defaults to PULL_BLOCK_TIMEOUT_S).
+    """
+
+    def __init__(self,
+                 consumer: Optional[Callable[[Dict], None]] = None,
+                 maxsize: int = 1000,
+                 policy: str = "drop_oldest",
+                 block_timeout_s: Optional[float] = None,
+                 name: str = "telemetry"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown dispatch policy {policy!r}, expected one of {POLICIES}")
+        self.consumer = consumer
+        self.maxsize = maxsize
+        self.policy = policy
+        if block_timeout_s is None and consumer is None:
+            block_timeout_s = PULL_BLOCK_TIMEOUT_S
+        self.block_timeout_s = block_timeout_s
+        self.name = name
+        self._cond = threading.Condition()
+        self._q = OrderedDict() if policy == "conflate" else deque()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        # Counters
+        self.enqueued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+
+    # Producer side
+    def put(self, msg: Dict) -> bool:
+        """Enqueue msg under the configured policy. Returns False if the message itself was dropped."""
+        with self._cond:
+            self.enqueued += 1
+            if self.policy == "conflate":
+                key = (msg.get("deviceId"), msg.get("type", "telemetry"))
+                if key in self._q:
+                    self._q[key] = msg  # replace in place, keeps the key's queue position
+                    self.conflated += 1
+                    metrics.incr(f"dispatch.{self.name}.conflated")
+                else:
+                    if len(self._q) >= self.maxsize:
+                        self._q.popitem(last=False)
+                        self._count_drop()
+                    self._q[key] = msg
+            elif self.policy == "drop_oldest":
+                if len(self._q) >= self.maxsize:
+                    self._q.popleft()
+                    self._count_drop()
+                self._q.append(msg)
+            else:  # block
+                if not self._cond.wait_for(lambda: len(self._q) < self.maxsize or self._stopped,
+                                           timeout=self.block_timeout_s):
+                    self._count_drop()
+                    return False
+                self._q.append(msg)
+            metrics.gauge(f"dispatch.{self.name}.depth", len(self._q))
+            self._cond.notify_all()
+            return True
+
+    __call__ = put  # usable directly as an on_telemetry callback
+
+    def _count_drop(self) -> None:
+        self.dropped += 1
+        metrics.incr(f"dispatch.{self.name}.dropped")
+
+    # Consumer side
+    def drain(self, max_items: Optional[int] = None) -> List[Dict]:
+        """Pop up to max_items queued messages (all if None) without blocking."""
+        with self._cond:
+            n = len(self._q) if max_items is None else min(max_items, len(self._q))
+            if self.policy == "conflate":
+                out = [self._q.popitem(last=False)[1] for _ in range(n)]
+            else:
+                out = [self._q.popleft() for _ in range(n)]
+            self.delivered += n
+            metrics.gauge(f"dispatch.{self.name}.depth", len(self._q))
+            if n:
+                self._cond.notify_all()  # wake blocked producers
+            return out
+
+    def start(self) -> "Dispatcher":
+        if self.consumer is None:
+            raise ValueError("start() needs a consumer; use drain() in pull mode")
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name=f"dispatch-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = 1.0) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._q or self._stopped)
+                if self._stopped and not self._q:
+                    return
+            for msg in self.drain(max_items=256):
+                with metrics.timer(f"dispatch.{self.name}.consume"):
+                    self.consumer(msg)
+
+    def __len__(self) -> int:
+        return len(self._q)
+
+    def stats(self) -> Dict:
+        return {
+            "policy": self.policy,
+            "depth": len(self._q),
+            "maxsize": self.maxsize,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+        }
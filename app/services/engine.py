@@ -0,0 +1,125 @@
+import threading, time
+from typing import Callable, Dict, Optional
+from pixkit_core import metrics
+from pixkit_core.events import compute_latency_ms
+from pixkit_core.utils import now_iso
+from pixkit_transports.registry import get_transport_class
+from pixkit_transports.replay import Recorder
+from services.controller import PixkitController
+from services.fleet_index import FleetIndex
+from services.rules import RuleEngine
+from services.twin import TwinStore
+from services.pubsub import PubSub, Subscription
+
+
+class SimEngine:
+    """
+    Process-wide simulation shared by every dashboard session.
+    - One SimTransport + PixkitController per device, created on first use.
+    - Telemetry and acks are fanned out through a PubSub bus (topics "telemetry/<id>", "ack/<id>").
+    - Acks are correlated once here, so each subscriber receives them with latency_ms attached.
+    - tick() is rate-limited per device, so N viewers do not run the car N times faster.
+    - fleet is a FleetIndex kept current from telemetry for spatial queries.
+    - twins merges telemetry and ack results into one versioned state per device.
+    - rules is a streaming RuleEngine; its alerts are published on the device's ack topic.
+    - transport_factory defaults to the registry's $PIXKIT_TRANSPORT class (sim); record_path taps every device into one Recorder log.
+    """
+
+    def __init__(self, tick_interval_s: float = 0.25, transport_factory: Optional[Callable] = None,
+                 record_path: Optional[str] = None, ack_timeout_s: float = 30.0):
+        self.tick_interval_s = tick_interval_s
+        self.ack_timeout_s = ack_timeout_s
+        self.transport_factory = transport_factory or get_transport_class()
+        self.recorder = Recorder(record_path) if record_path else None
+        self.bus = PubSub()
+        self.fleet = FleetIndex()
+        self.twins = TwinStore()
+        self.rules = RuleEngine(on_alert=self._publish_alert)
+        self._lock = threading.RLock()
+        self._controllers: Dict[str, PixkitController] = {}
+        self._last_tick: Dict[str, float] = {}
+
+    def controller(self, device_id: str) -> PixkitController:
+        with self._lock:
+            ctrl = self._controllers.get(device_id)
+            if ctrl is None:
+                ctrl = self._build(device_id)
+                self._controllers[device_id] = ctrl
+            return ctrl
+
+    def _build(self, device_id: str) -> PixkitController:
+        topic_tel = f"telemetry/{device_id}"
+        topic_ack = f"ack/{device_id}"
+        holder = {}
+
+        def on_telemetry(msg):
+            self.fleet.update_from_telemetry(msg)
+            self.twins.apply(msg)
+            self.rules.observe(msg)
+            self.bus.publish(topic_tel, msg)
+
+        def on_ack(ack):
+            ctrl = holder["ctrl"]
+            action = ctrl.get_action(ack["correlation_id"])
+            latency_ms = None
+            ctrl.record_ack(ack)
+            self.twins.apply_ack(ack, device_id=device_id)
+            if action:
+                latency_ms = compute_latency_ms(action, type("AckObj", (object,), ack)())
+                ctrl.clear_action(ack["correlation_id"])
+            self.bus.publish(topic_ack, dict(ack, latency_ms=latency_ms))
+
+        transport = self.transport_factory(device_id=device_id, on_telemetry=on_telemetry, on_ack=on_ack)
+        transport.connect()
+        if self.recorder:
+            self.recorder.attach(transport)
+        holder["ctrl"] = PixkitController(transport)
+        return holder["ctrl"]
+
+    def _publish_alert(self, alert: Dict) -> None:
+        self.bus.publish(f"ack/{alert['result']['deviceId']}", alert)
+
+    def subscribe(self, device_id: str, maxlen: int = 1000) -> Dict[str, Subscription]:
+        """Per-session subscriptions for a device: {'telemetry': Subscription, 'ack': Subscription}."""
+        self.controller(device_id)
+        return {
+            "telemetry": self.bus.subscribe(f"telemetry/{device_id}", maxlen=maxlen),
+            "ack": self.bus.subscribe(f"ack/{device_id}", maxlen=maxlen),
+        }
+
+    def execute(self, device_id: str, command: str, params: Optional[Dict] = None, requested_by: str = "local") -> str:
+        ctrl = self.controller(device_id)
+        with self._lock:
+            return ctrl.execute(command, params, requested_by=requested_by)
+
+    def tick(self, device_id: str, noise_level: float = 0.1) -> bool:
+        """Advance the device simulation if its tick interval has elapsed. Returns True if it stepped."""
+        ctrl = self.controller(device_id)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_tick.get(device_id, float("-inf")) < self.tick_interval_s:
+                return False
+            self._last_tick[device_id] = now
+            ctrl.transport.tick(noise_level=noise_level)
+            self.rules.flush()
+            for action in ctrl.expire_pending(self.ack_timeout_s):
+                self.bus.publish(f"ack/{device_id}", {
+                    "type": "timeout",
+                    "correlation_id": action.correlation_id,
+                    "command": action.command,
+                    "accepted": False,
+                    "message": f"No ack within {self.ack_timeout_s:g}s",
+                    "ts_end": now_iso(),
+                    "result": {},
+                    "latency_ms": None,
+                })
+                metrics.incr("engine.ack_timeouts")
+            if self.recorder:
+                self.recorder.flush()
+            metrics.gauge("engine.subscribers", self.bus.subscriber_count(f"telemetry/{device_id}"), device=device_id)
+            metrics.gauge("engine.pending_actions", len(ctrl.pending), device=device_id)
+            return True
+
+    def devices(self):
+        with self._lock:
+            return list(self._controllers)
@@ -0,0 +1,171 @@
+import heapq, math, threading
+from typing import Dict, List, Optional, Set, Tuple
+
+EARTH_M_PER_DEG = 111_000.0  # same approximation as Car._simulate_gps
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Equirectangular distance; accurate to well under 1% at fleet scales (a few km)."""
+    x = (lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2.0))
+    y = lat2 - lat1
+    return math.hypot(x, y) * EARTH_M_PER_DEG
+
+
+def _ring(ci: int, cj: int, r: int):
+    """Cells on the perimeter of the (2r+1)x(2r+1) square centred on (ci, cj)."""
+    if r == 0:
+        yield (ci, cj)
+        return
+    for j in range(cj - r, cj + r + 1):
+        yield (ci - r, j)
+        yield (ci + r, j)
+    for i in range(ci - r + 1, ci + r):
+        yield (i, cj - r)
+        yield (i, cj + r)
+
+
+class FleetIndex:
+    """
+    Uniform lat/lon grid (geohash-style fixed cells) over the latest position of each device.
+    - update() moves a device between cells in O(1).
+    - radius()/bbox()/nearest() visit only the cells covering the query (or, for queries
+      larger than the occupied grid, only the occupied cells), so cost follows the query
+      area and result size rather than the fleet size.
+    """
+
+    def __init__(self, cell_m: float = 250.0):
+        self.cell_deg = cell_m / EARTH_M_PER_DEG
+        self._lock = threading.Lock()
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._pos: Dict[str, Tuple[float, float, Tuple[int, int]]] = {}
+
+    def _key(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    # Updates
+    def update(self, device_id: str, lat: float, lon: float) -> None:
+        key = self._key(lat, lon)
+        with self._lock:
+            old = self._pos.get(device_id)
+            if old is not None and old[2] != key:
+                cell = self._cells.get(old[2])
+                if cell is not None:
+                    cell.discard(device_id)
+                    if not cell:
+                        del self._cells[old[2]]
+            if old is None or old[2] != key:
+                self._cells.setdefault(key, set()).add(device_id)
+            self._pos[device_id] = (lat, lon, key)
+
+    def update_from_telemetry(self, msg: Dict) -> None:
+        gps = msg.get("gps")
+        if gps and msg.get("deviceId"):
+            self.update(msg["deviceId"], gps["lat"], gps["lon"])
+
+    def remove(self, device_id: str) -> None:
+        with self._lock:
+            old = self._pos.pop(device_id, None)
+            if old is not None:
+                cell = self._cells.get(old[2])
+                if cell is not None:
+                    cell.discard(device_id)
+                    if not cell:
+                        del self._cells[old[2]]
+
+    def position(self, device_id: str) -> Optional[Tuple[float, float]]:
+        p = self._pos.get(device_id)
+        return (p[0], p[1]) if p else None
+
+    # Queries
+    def _scan_cells(self, k0: Tuple[int, int], k1: Tuple[int, int]):
+        """Devices (device_id, lat, lon) in the cell range. When the range spans more cells than
+        are occupied (huge viewports), walk the occupied cells instead of the range."""
+        n_cells = (k1[0] - k0[0] + 1) * (k1[1] - k0[1] + 1)
+        with self._lock:
+            if n_cells > len(self._cells):
+                hits = []
+                for (i, j), cell in self._cells.items():
+                    if k0[0] <= i <= k1[0] and k0[1] <= j <= k1[1]:
+                        for d in cell:
+                            p = self._pos[d]
+                            hits.append((d, p[0], p[1]))
+            else:
+                hits = []
+                for i in range(k0[0], k1[0] + 1):
+                    for j in range(k0[1], k1[1] + 1):
+                        for d in self._cells.get((i, j), ()):
+                            p = self._pos[d]
+                            hits.append((d, p[0], p[1]))
+        return hits
+
+    def _cell_distance_m(self, lat: float, lon: float, key: Tuple[int, int]) -> float:
+        """Distance from (lat, lon) to the closest point of cell `key`."""
+        c = self.cell_deg
+        return distance_m(lat, lon, min(max(lat, key[0] * c), (key[0] + 1) * c),
+                          min(max(lon, key[1] * c), (key[1] + 1) * c))
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Dict]:
+        hits = self._scan_cells(self._key(min_lat, min_lon), self._key(max_lat, max_lon))
+        return [{"deviceId": d, "lat": la, "lon": lo} for d, la, lo in hits
+                if min_lat <= la <= max_lat and min_lon <= lo <= max_lon]
+
+    def radius(self, lat: float, lon: float, radius_m: float) -> List[Dict]:
+        """Devices within radius_m of (lat, lon), nearest first."""
+        dlat = radius_m / EARTH_M_PER_DEG
+        dlon = dlat / max(1e-6, math.cos(math.radians(lat)))
+        hits = self._scan_cells(self._key(lat - dlat, lon - dlon), self._key(lat + dlat, lon + dlon))
+        out = []
+        for d, la, lo in hits:
+            dist = distance_m(lat, lon, la, lo)
+            if dist <= radius_m:
+                out.append({"deviceId": d, "lat": la, "lon": lo, "distance_m": dist})
+        out.sort(key=lambda r: r["distance_m"])
+        return out
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Dict]:
+        """k nearest devices, searching outward ring by ring from the query cell."""
+        if k <= 0 or not self._pos:
+            return []
+        ci, cj = self._key(lat, lon)
+        lon_scale = max(1e-6, math.cos(math.radians(lat)))
+        cell_floor_m = self.cell_deg * EARTH_M_PER_DEG * min(1.0, lon_scale)
+        best: List[Tuple[float, str, float, float]] = []  # max-heap via negated distance
+
+        def visit(cell):
+            for d in cell:
+                la, lo, _ = self._pos[d]
+                item = (-distance_m(lat, lon, la, lo), d, la, lo)
+                if len(best) < k:
+                    heapq.heappush(best, item)
+                elif item > best[0]:
+                    heapq.heapreplace(best, item)
+
+        with self._lock:
+            total = len(self._pos)
+            seen = 0
+            r = 0
+            while True:
+                if (2 * r + 1) ** 2 > 4 * len(self._cells):
+                    # Ring now larger than the occupied grid (query far from the fleet): visit the
+                    # remaining occupied cells nearest-first, stopping once none can be closer
+                    rest = sorted((self._cell_distance_m(lat, lon, key), key) for key in self._cells
+                                  if max(abs(key[0] - ci), abs(key[1] - cj)) >= r)
+                    for floor_m, key in rest:
+                        if len(best) == k and -best[0][0] <= floor_m:
+                            break
+                        visit(self._cells[key])
+                    break
+                for key in _ring(ci, cj, r):
+                    cell = self._cells.get(key)
+                    if cell:
+                        seen += len(cell)
+                        visit(cell)
+                # Anything outside ring r is at least r cells away (shrunk by lon scale)
+                if seen >= total or (len(best) == k and -best[0][0] <= r * cell_floor_m):
+                    break
+                r += 1
+        return [{"deviceId": d, "lat": la, "lon": lo, "distance_m": -nd}
+                for nd, d, la, lo in sorted(best, reverse=True)]
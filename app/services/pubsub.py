@@ -0,0 +1,71 @@
+import threading, weakref
+from collections import deque
+from typing import Any, Dict, List
+from pixkit_core import metrics
+
+
+class Subscription:
+    """
+    Bounded per-subscriber buffer.
+    When full, the oldest message is dropped so a slow reader never blocks the publisher.
+    """
+
+    def __init__(self, topic: str, maxlen: int = 1000):
+        self.topic = topic
+        self.maxlen = maxlen
+        self.dropped = 0
+        self._buf = deque(maxlen=maxlen)
+
+    def put(self, msg: Any) -> None:
+        if len(self._buf) >= self.maxlen:
+            self.dropped += 1
+            metrics.incr("pubsub.dropped")
+        self._buf.append(msg)
+
+    def drain(self) -> List[Any]:
+        """Return and remove everything buffered so far."""
+        out = []
+        while True:
+            try:
+                out.append(self._buf.popleft())
+            except IndexError:
+                return out
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+
+class PubSub:
+    """
+    In-process topic fan-out.
+    Subscribers are held weakly: dropping the Subscription (e.g. a closed browser
+    session) unsubscribes it automatically.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._topics: Dict[str, "weakref.WeakSet[Subscription]"] = {}
+
+    def subscribe(self, topic: str, maxlen: int = 1000) -> Subscription:
+        sub = Subscription(topic, maxlen=maxlen)
+        with self._lock:
+            self._topics.setdefault(topic, weakref.WeakSet()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._topics.get(sub.topic)
+            if subs is not None:
+                subs.discard(sub)
+
+    def publish(self, topic: str, msg: Any) -> int:
+        """Deliver msg to every subscriber of topic; returns the number of receivers."""
+        with self._lock:
+            subs = list(self._topics.get(topic, ()))
+        for sub in subs:
+            sub.put(msg)
+        return len(subs)
+
+    def subscriber_count(self, topic: str) -> int:
+        with self._lock:
+            return len(self._topics.get(topic, ()))
@@ -0,0 +1,238 @@
+import math, threading, time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from pixkit_core import metrics
+from pixkit_core.car import MODE_MAX_SPEED
+from pixkit_core.utils import iso_to_epoch, now_iso
+
+METRICS = ("speed", "battery", "temperature")
+_OPS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}
+
+
+def _msg_time(msg: Dict, arrival: float) -> float:
+    """Sample time of a message; a missing or unparsable ts falls back to its arrival time."""
+    try:
+        return iso_to_epoch(msg["ts"])
+    except (KeyError, TypeError, ValueError, AttributeError):
+        metrics.incr("rules.bad_ts")
+        return arrival
+
+
+def _num(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+@dataclass
+class Rule:
+    """
+    Declarative telemetry rule.
+    kind:
+      - "threshold":  metric <op> value
+      - "rate":       exponentially-windowed rate of change (units/s over ~window_s) <op> value
+      - "zscore":     |metric - rolling mean| / rolling std  >  value   (anomaly)
+      - "mode_limit": speed > MODE_MAX_SPEED[mode] * (1 + value)
+    """
+    name: str
+    metric: str = "battery"
+    kind: str = "threshold"
+    op: str = "<"
+    value: float = 0.0
+    window_s: float = 30.0
+    severity: str = "warning"
+
+
+DEFAULT_RULES = [
+    Rule("battery_low", metric="battery", op="<", value=15.0, severity="critical"),
+    Rule("temperature_rising", metric="temperature", kind="rate", op=">", value=0.5, window_s=30.0),
+    Rule("over_mode_speed", metric="speed", kind="mode_limit", value=0.05),
+]
+
+
+class RuleEngine:
+    """
+    Streaming rule evaluation over telemetry with O(1) state per (device, rule).
+    - observe(msg) is the on_telemetry hook; messages are batched and evaluate() runs
+      vectorized (numpy) across every device in the batch.
+    - Rolling statistics are exponentially windowed (last value/time, EW rate, EW mean/var),
+      so no raw history is kept.
+    - Bad rows never raise out of the hot path: no deviceId/metrics is dropped (rules.dropped),
+      an unparsable ts falls back to arrival time (rules.bad_ts), a non-numeric metric is NaN.
+    - Alerts are edge-triggered (raised once on entry, "cleared" on exit) and delivered to
+      on_alert as ack-shaped dicts so they flow through the existing ack/log path.
+    """
+
+    def __init__(self, rules: Optional[List[Rule]] = None, on_alert: Optional[Callable[[Dict], None]] = None,
+                 batch_size: int = 256, capacity: int = 64):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        for r in self.rules:
+            if r.metric not in METRICS:
+                raise ValueError(f"Rule {r.name}: unknown metric {r.metric!r}")
+            if r.kind in ("threshold", "rate") and r.op not in _OPS:
+                raise ValueError(f"Rule {r.name}: unknown op {r.op!r}")
+        self.on_alert = on_alert
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._eval_lock = threading.Lock()
+        self._batch: List[Tuple[Dict, float]] = []  # (msg, sample time)
+        self._rows: Dict[str, int] = {}
+        self._ids: List[str] = []
+        n_r = len(self.rules)
+        self._last_v = np.full((capacity, n_r), np.nan)
+        self._last_t = np.full((capacity, n_r), np.nan)
+        self._ew_a = np.zeros((capacity, n_r))   # EW rate (rate rules) or EW mean (zscore)
+        self._ew_b = np.zeros((capacity, n_r))   # EW variance (zscore)
+        self._active = np.zeros((capacity, n_r), dtype=bool)
+
+    # Ingest
+    def observe(self, msg: Dict) -> None:
+        if msg.get("type", "telemetry") != "telemetry":
+            return
+        if not isinstance(msg.get("metrics"), dict) or not msg.get("deviceId"):
+            metrics.incr("rules.dropped")
+            return
+        t = _msg_time(msg, time.time())
+        with self._lock:
+            self._batch.append((msg, t))
+            full = len(self._batch) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> List[Dict]:
+        with self._lock:
+            batch, self._batch = self._batch, []
+        if not batch:
+            return []
+        # A device seen twice in one batch must be evaluated in order: split into rounds
+        rounds: List[List[Dict]] = []
+        times: List[List[float]] = []
+        seen: Dict[str, int] = {}
+        for msg, t in batch:
+            k = seen.get(msg["deviceId"], 0)
+            seen[msg["deviceId"]] = k + 1
+            if k == len(rounds):
+                rounds.append([])
+                times.append([])
+            rounds[k].append(msg)
+            times[k].append(t)
+        alerts = []
+        with self._eval_lock, metrics.timer("rules.evaluate"):
+            for r, t in zip(rounds, times):
+                alerts.extend(self.evaluate(r, t))
+        return alerts
+
+    def _row(self, device_id: str) -> int:
+        row = self._rows.get(device_id)
+        if row is None:
+            row = len(self._ids)
+            if row >= self._last_v.shape[0]:
+                self._grow()
+            self._rows[device_id] = row
+            self._ids.append(device_id)
+        return row
+
+    def _grow(self) -> None:
+        n = self._last_v.shape[0]
+        pad = lambda a, fill: np.concatenate([a, np.full((n, a.shape[1]), fill, dtype=a.dtype)])
+        self._last_v = pad(self._last_v, np.nan)
+        self._last_t = pad(self._last_t, np.nan)
+        self._ew_a = pad(self._ew_a, 0.0)
+        self._ew_b = pad(self._ew_b, 0.0)
+        self._active = pad(self._active, False)
+
+    # Evaluation
+    def evaluate(self, batch: List[Dict], times: Optional[Sequence[float]] = None) -> List[Dict]:
+        """
+        Evaluate one batch (each device at most once) against all rules, vectorized per rule.
+        times are the sample times from observe(); without them each ts is parsed here.
+        """
+        if times is None:
+            now = time.time()
+            times = [_msg_time(m, now) for m in batch]
+        rows = np.fromiter((self._row(m["deviceId"]) for m in batch), dtype=np.intp, count=len(batch))
+        t = np.asarray(times, dtype=float)
+        vals = {k: np.fromiter((_num(m["metrics"].get(k, np.nan)) for m in batch), dtype=float, count=len(batch))
+                for k in METRICS}
+        limits = np.fromiter((MODE_MAX_SPEED.get(m.get("mode"), MODE_MAX_SPEED["manual"]) for m in batch),
+                             dtype=float, count=len(batch))
+
+        alerts = []
+        for j, rule in enumerate(self.rules):
+            v = vals[rule.metric]
+            if rule.kind == "threshold":
+                hit = _OPS[rule.op](v, rule.value)
+                observed = v
+            elif rule.kind == "mode_limit":
+                hit = v > limits * (1.0 + rule.value)
+                observed = v
+            elif rule.kind == "rate":
+                last_v, last_t = self._last_v[rows, j], self._last_t[rows, j]
+                dt = t - last_t
+                ok = np.isfinite(dt) & (dt > 0)
+                inst = np.where(ok, (v - last_v) / np.where(ok, dt, 1.0), 0.0)
+                alpha = np.where(ok, 1.0 - np.exp(-np.where(ok, dt, 0.0) / rule.window_s), 0.0)
+                rate = self._ew_a[rows, j] + alpha * (inst - self._ew_a[rows, j])
+                self._ew_a[rows, j] = rate
+                self._last_v[rows, j], self._last_t[rows, j] = v, t
+                # Only judge once the window has had time to fill
+                warm = np.isfinite(last_t)
+                hit = warm & _OPS[rule.op](rate, rule.value)
+                observed = rate
+            elif rule.kind == "zscore":
+                last_t = self._last_t[rows, j]
+                first = ~np.isfinite(last_t)
+                dt = np.where(first, 0.0, t - last_t)
+                alpha = np.where(first, 1.0, 1.0 - np.exp(-np.maximum(dt, 0.0) / rule.window_s))
+                mean, var = self._ew_a[rows, j], self._ew_b[rows, j]
+                std = np.sqrt(var)
+                z = np.where(std > 0, np.abs(v - mean) / np.where(std > 0, std, 1.0), 0.0)
+                diff = v - mean
+                self._ew_a[rows, j] = mean + alpha * diff
+                self._ew_b[rows, j] = (1.0 - alpha) * (var + alpha * diff * diff)
+                self._last_t[rows, j] = t
+                hit = ~first & (z > rule.value)
+                observed = z
+            else:
+                raise ValueError(f"Rule {rule.name}: unknown kind {rule.kind!r}")
+
+            was = self._active[rows, j]
+            hit = np.nan_to_num(hit, nan=0).astype(bool)
+            self._active[rows, j] = hit
+            for i in np.flatnonzero(hit != was):
+                alerts.append(self._alert(rule, batch[i], bool(hit[i]), float(observed[i])))
+
+        for a in alerts:
+            metrics.incr(f"rules.alerts.{a['result']['rule']}")
+            if self.on_alert:
+                self.on_alert(a)
+        return alerts
+
+    def _alert(self, rule: Rule, msg: Dict, raised: bool, observed: float) -> Dict:
+        state = "raised" if raised else "cleared"
+        label = {"rate": f"{rule.metric}/s", "zscore": f"{rule.metric} z"}.get(rule.kind, rule.metric)
+        return {
+            "type": "alert",
+            "correlation_id": "",
+            "command": f"alert:{rule.name}",
+            "accepted": not raised,
+            "message": f"{rule.name} {state} ({label}={observed:.3f})",
+            "ts_end": now_iso(),
+            "result": {
+                "rule": rule.name,
+                "state": state,
+                "severity": rule.severity,
+                "deviceId": msg.get("deviceId"),
+                "seq": msg.get("seq"),
+                "observed": None if math.isnan(observed) else round(observed, 4),
+            },
+        }
+
+    def active(self) -> List[Dict]:
+        """Currently active (device, rule) alerts."""
+        out = []
+        for i, j in zip(*np.nonzero(self._active[:len(self._ids)])):
+            out.append({"deviceId": self._ids[i], "rule": self.rules[j].name, "severity": self.rules[j].severity})
+        return out
@@ -0,0 +1,148 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from pixkit_core import metrics
+
+
+def flatten(d: Dict, prefix: str = "") -> Dict:
+    """{'metrics': {'speed': 1}} -> {'metrics.speed': 1}"""
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten(v, key + "."))
+        else:
+            out[key] = v
+    return out
+
+
+class DeviceTwin:
+    """Current merged state of one device, with a per-field revision for cheap change reads."""
+
+    __slots__ = ("device_id", "state", "field_rev", "rev", "seq", "seq_types", "ts")
+
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+        self.state: Dict = {}
+        self.field_rev: Dict[str, int] = {}
+        self.rev = 0          # local change counter, bumps once per accepted update that changed something
+        self.seq = -1         # highest device seq applied
+        self.seq_types = set()  # message types already applied at self.seq (status shares seq with telemetry)
+        self.ts = ""          # device timestamp of the newest accepted update
+
+    def merge(self, fields: Dict) -> Dict:
+        changed = {k: v for k, v in fields.items() if self.state.get(k, _MISSING) != v}
+        if changed:
+            self.rev += 1
+            self.state.update(changed)
+            for k in changed:
+                self.field_rev[k] = self.rev
+        return changed
+
+
+_MISSING = object()
+
+# Message keys that are envelope, not state
+_ENVELOPE = ("type", "deviceId", "seq", "ts", "trace", "correlationId", "correlation_id", "latency_ms", "report")
+
+
+class TwinStore:
+    """
+    Device twins keyed by deviceId (O(1) lookup).
+    - Telemetry/status are versioned by seq: older seqs (and repeats of the same type at the
+      same seq) are rejected, so redelivered or out-of-order messages never roll state back.
+    - A lower seq with a newer device ts is a device restart (seq counter reset): the twin
+      resyncs to the new seq instead of rejecting that device forever.
+    - Ack results are merged only if the ack is not older than the newest applied update.
+    - Readers poll changes_since(device_id, rev) to receive only fields changed after rev,
+      or register on_change callbacks.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._twins: Dict[str, DeviceTwin] = {}
+        self._listeners: List[Callable[[str, Dict, int], None]] = []
+        self.accepted = 0
+        self.rejected = 0
+
+    def _twin(self, device_id: str) -> DeviceTwin:
+        twin = self._twins.get(device_id)
+        if twin is None:
+            twin = self._twins[device_id] = DeviceTwin(device_id)
+        return twin
+
+    def apply(self, msg: Dict) -> Optional[Dict]:
+        """Merge a telemetry/status message. Returns the changed fields, or None if rejected as stale."""
+        device_id = msg.get("deviceId")
+        if not device_id:
+            return None
+        kind = msg.get("type", "telemetry")
+        seq = msg.get("seq")
+        with self._lock:
+            twin = self._twin(device_id)
+            if seq is not None:
+                if seq < twin.seq and msg.get("ts", "") > twin.ts:
+                    twin.seq, twin.seq_types = seq, set()
+                    metrics.incr("twin.resync")
+                if seq < twin.seq or (seq == twin.seq and kind in twin.seq_types):
+                    self.rejected += 1
+                    metrics.incr("twin.rejected_stale")
+                    return None
+                if seq > twin.seq:
+                    twin.seq, twin.seq_types = seq, set()
+                twin.seq_types.add(kind)
+            if msg.get("ts", "") > twin.ts:
+                twin.ts = msg["ts"]
+            changed = twin.merge(flatten({k: v for k, v in msg.items() if k not in _ENVELOPE}))
+            rev = twin.rev
+            self.accepted += 1
+        self._notify(device_id, changed, rev)
+        return changed
+
+    def apply_ack(self, ack: Dict, device_id: Optional[str] = None) -> Optional[Dict]:
+        """Merge an ack's partial result dict into the twin."""
+        device_id = device_id or ack.get("deviceId") or (ack.get("result") or {}).get("deviceId")
+        result = ack.get("result")
+        if not device_id or not result or ack.get("type") == "alert" or ack.get("accepted") is False:
+            return None
+        ts = ack.get("ts_end") or ack.get("ts") or ""
+        with self._lock:
+            twin = self._twin(device_id)
+            if ts and ts < twin.ts:
+                self.rejected += 1
+                metrics.incr("twin.rejected_stale")
+                return None
+            twin.ts = max(twin.ts, ts)
+            changed = twin.merge(flatten(result))
+            rev = twin.rev
+            self.accepted += 1
+        self._notify(device_id, changed, rev)
+        return changed
+
+    def _notify(self, device_id: str, changed: Dict, rev: int) -> None:
+        if changed:
+            for fn in list(self._listeners):
+                fn(device_id, changed, rev)
+
+    # Reads
+    def get(self, device_id: str) -> Optional[Dict]:
+        twin = self._twins.get(device_id)
+        if twin is None:
+            return None
+        with self._lock:
+            return dict(twin.state, seq=twin.seq, ts=twin.ts, rev=twin.rev)
+
+    def changes_since(self, device_id: str, rev: int = 0) -> Tuple[Dict, int]:
+        """Fields changed after rev, and the twin's current rev (pass it back next time)."""
+        twin = self._twins.get(device_id)
+        if twin is None:
+            return {}, rev
+        with self._lock:
+            if twin.rev <= rev:
+                return {}, twin.rev
+            return {k: twin.state[k] for k, r in twin.field_rev.items() if r > rev}, twin.rev
+
+    def on_change(self, fn: Callable[[str, Dict, int], None]) -> None:
+        self._listeners.append(fn)
+
+    def devices(self) -> List[str]:
+        return list(self._twins)
@@ -0,0 +1,81 @@
+"""
+Emergency-stop latency under a saturated command load.
+
+A SimTransport device with limited throughput (--max-per-tick) is flooded with a
+backlog of control/aux/bulk commands, then an emergency_stop is issued and the
+time until its ack is measured. Run with and without priority lanes to compare:
+
+    python -m tools.bench_estop --backlog 200 --trials 20
+"""
+import argparse, json, random, statistics, sys, time
+from pixkit_transports.sim import MockPolicy, SimTransport
+from services.controller import PixkitController
+
+BACKLOG_MIX = [
+    ("set_controls", {"mode": "cruise", "throttle": 0.6, "steering": 0.0}),
+    ("set_aux", {"lights": "low", "horn": False}),
+    ("firmware_update", {"version": "1.0.1"}),
+]
+
+
+def run_trial(backlog: int, use_priorities: bool, policy: MockPolicy, tick_s: float, timeout_s: float) -> float:
+    acks = {}
+    transport = SimTransport("bench-car", on_telemetry=lambda _: None,
+                             on_ack=lambda a: acks.setdefault(a["correlation_id"], time.perf_counter()))
+    transport.set_policy(policy)
+    ctrl = PixkitController(transport, use_priorities=use_priorities)
+    ctrl.execute("start", {}, requested_by="bench")
+    for _ in range(backlog):
+        cmd, params = random.choice(BACKLOG_MIX)
+        ctrl.execute(cmd, params, requested_by="bench")
+
+    t0 = time.perf_counter()
+    corr = ctrl.execute("emergency_stop", {"reason": "bench"}, requested_by="bench")
+    while corr not in acks:
+        if time.perf_counter() - t0 > timeout_s:
+            return float("nan")
+        transport.tick(noise_level=0.0)
+        time.sleep(tick_s)
+    return (acks[corr] - t0) * 1000.0
+
+
+def summarize(samples):
+    ok = sorted(s for s in samples if s == s)
+    if not ok:
+        return {"n": 0, "timeouts": len(samples)}
+    q = lambda p: ok[min(len(ok) - 1, int(round(p * (len(ok) - 1))))]
+    return {"n": len(ok), "timeouts": len(samples) - len(ok), "p50_ms": round(q(0.5), 1),
+            "p95_ms": round(q(0.95), 1), "max_ms": round(ok[-1], 1), "mean_ms": round(statistics.mean(ok), 1)}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backlog", type=int, default=200, help="queued commands before the emergency_stop")
+    ap.add_argument("--trials", type=int, default=10)
+    ap.add_argument("--max-per-tick", type=int, default=2, help="device throughput (actions per tick)")
+    ap.add_argument("--tick-ms", type=float, default=10.0)
+    ap.add_argument("--min-latency-ms", type=int, default=20)
+    ap.add_argument("--max-latency-ms", type=int, default=60)
+    ap.add_argument("--timeout-s", type=float, default=30.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    random.seed(args.seed)
+    policy = MockPolicy(args.min_latency_ms, args.max_latency_ms, 0.0, max_per_tick=args.max_per_tick)
+    report = {}
+    for label, use_priorities in (("priority_lanes", True), ("fifo", False)):
+        samples = [run_trial(args.backlog, use_priorities, policy, args.tick_ms / 1000.0, args.timeout_s)
+                   for _ in range(args.trials)]
+        report[label] = summarize(samples)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for label, s in report.items():
+            print(f"{label:<16}" + "  ".join(f"{k}={v}" for k, v in s.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Cold-start import timing.
+
+Each target is imported in a fresh interpreter (so nothing is cached) and the
+median wall time over --repeat runs is reported. Targets are module names, or
+"transport:<name>" to time resolving a transport through the lazy registry.
+
+    python -m tools.import_time
+    python -m tools.import_time transport:mqtt services.engine --repeat 5 --json
+"""
+import argparse, json, os, statistics, subprocess, sys
+
+DEFAULT_TARGETS = [
+    "pixkit_core.metrics",
+    "pixkit_transports.registry",
+    "transport:sim",
+    "transport:replay",
+    "transport:mqtt",
+    "services.engine",
+    "pandas",
+    "streamlit",
+]
+
+_SNIPPET = """
+import time
+t0 = time.perf_counter()
+{stmt}
+print(time.perf_counter() - t0)
+"""
+
+
+def measure(target: str, repeat: int = 3) -> dict:
+    if target.startswith("transport:"):
+        stmt = f"from pixkit_transports.registry import get_transport_class; get_transport_class({target.split(':', 1)[1]!r})"
+    else:
+        stmt = f"import {target}"
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=app_dir + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    runs, error = [], None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", _SNIPPET.format(stmt=stmt)],
+                              capture_output=True, text=True, cwd=app_dir, env=env)
+        if proc.returncode != 0:
+            error = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+            break
+        runs.append(float(proc.stdout.strip().splitlines()[-1]) * 1000.0)
+    return {"target": target, "median_ms": round(statistics.median(runs), 2) if runs else None, "error": error}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("targets", nargs="*", default=DEFAULT_TARGETS)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = ap.parse_args(argv)
+
+    results = [measure(t, args.repeat) for t in args.targets]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            val = f"{r['median_ms']:>9.2f} ms" if r["median_ms"] is not None else f"  error: {r['error']}"
+            print(f"{r['target']:<32}{val}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
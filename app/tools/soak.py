@@ -0,0 +1,232 @@
+"""
+Headless soak / load harness.
+
+Drives PixkitController + a transport with a weighted command mix at a fixed rate,
+samples process RSS, live object count, queue depths and ack-latency percentiles
+(controller send to ack receipt, on the monotonic clock) every --sample-s, and writes a JSON report. Exit status is 1 when any threshold is
+exceeded, so it can gate CI or an overnight run. The object count excludes what the
+bounded buffers (telemetry buffer, recent traces) hold, since their fill-up is expected
+and would otherwise read as a leak on any run shorter than the time to fill them.
+
+    python -m tools.soak --duration-s 3600 --rate 20 --report soak.json
+    python -m tools.soak --transport mqtt --duration-s 600     # needs broker + simulator:
+    python connections/simulator_mqtt.py                       # (from app/; or -m connections.simulator_mqtt)
+
+--record PATH (default $PIXKIT_RECORD_PATH) logs every telemetry/ack message the run
+receives, so a field session can be replayed later with PIXKIT_TRANSPORT=replay.
+"""
+import argparse, gc, json, os, random, sys, threading, time
+from collections import deque
+from typing import Dict, List, Optional
+from pixkit_transports.registry import create_transport
+from pixkit_transports.replay import Recorder
+from pixkit_transports.sim import MockPolicy
+from services.controller import PixkitController
+
+DEFAULT_MIX = "set_controls=6,set_aux=2,start=1,stop=1,firmware_update=0.2,emergency_stop=0.1"
+PARAMS = {
+    "set_controls": lambda: {"mode": random.choice(["manual", "cruise", "sport", "eco"]),
+                             "throttle": round(random.random(), 2), "steering": round(random.uniform(-1, 1), 2)},
+    "set_aux": lambda: {"lights": random.choice(["off", "low", "high", "hazard"]), "horn": random.random() < 0.1},
+    "firmware_update": lambda: {"version": f"1.0.{random.randint(0, 9)}"},
+    "emergency_stop": lambda: {"reason": "soak"},
+}
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux /proc), falling back to peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def buffered_objects(*buffers) -> int:
+    """gc-tracked containers reachable from the items of bounded buffers (data only)."""
+    seen, stack = set(), [item for buf in buffers for item in buf]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or not isinstance(o, (dict, list, tuple)) or not gc.is_tracked(o):
+            continue
+        seen.add(id(o))
+        stack.extend(gc.get_referents(o))
+    return len(seen)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def pct(sorted_vals: List[float], q: float) -> Optional[float]:
+    if not sorted_vals:
+        return None
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))]
+
+
+def slope_per_hour(xs: List[float], ys: List[float]) -> float:
+    """Least-squares slope of ys over xs (seconds), scaled to units/hour."""
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mx, my = sum(xs) / n, sum(ys) / n
+    den = sum((x - mx) ** 2 for x in xs)
+    return 0.0 if den == 0 else sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / den * 3600.0
+
+
+class Soak:
+    def __init__(self, args):
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.telemetry = deque(maxlen=args.buffer)  # stands in for the dashboard's bounded buffer
+        self.telemetry_seen = 0
+        self.latencies: List[float] = []  # appended on the transport's thread, swapped by sample()
+        self.acks = self.lost = 0
+        self._lock = threading.Lock()
+        self.samples: List[Dict] = []
+        transport = create_transport(args.transport, device_id=args.device_id,
+                                     on_telemetry=self.on_telemetry, on_ack=self.on_ack)
+        if hasattr(transport, "set_policy"):
+            transport.set_policy(MockPolicy(args.min_latency_ms, args.max_latency_ms, args.failure_rate))
+        self.recorder = Recorder(args.record) if args.record else None
+        if self.recorder:
+            self.recorder.attach(transport)
+        self.controller = PixkitController(transport)
+
+    def on_telemetry(self, msg):
+        self.telemetry.append(msg)
+        self.telemetry_seen += 1
+
+    def on_ack(self, ack):
+        corr = ack.get("correlation_id") or ack.get("correlationId")
+        latency_ms = self.controller.elapsed_ms(corr)
+        with self._lock:
+            if latency_ms is not None:
+                self.latencies.append(latency_ms)
+            self.acks += 1
+        self.controller.record_ack(ack)
+        self.controller.clear_action(corr)
+
+    def sample(self, t: float) -> Dict:
+        gc.collect()
+        with self._lock:
+            lat, self.latencies = sorted(self.latencies), []
+            acks = self.acks
+        transport = self.controller.transport
+        buffered = buffered_objects(self.telemetry, self.controller.traces.recent)
+        s = {
+            "t_s": round(t, 2),
+            "rss_mb": round(rss_mb(), 2),
+            "objects": len(gc.get_objects()) - buffered,
+            "buffered_objects": buffered,
+            "pending_actions": len(self.controller.pending),
+            "transport_queue": getattr(transport, "pending_count", None),
+            "telemetry_buffer": len(self.telemetry),
+            "trace_buffer": len(self.controller.traces.recent),
+            "acks": acks,
+            "lost_acks": self.lost,
+            "ack_p50_ms": pct(lat, 0.5),
+            "ack_p95_ms": pct(lat, 0.95),
+            "ack_p99_ms": pct(lat, 0.99),
+        }
+        self.samples.append(s)
+        return s
+
+    def run(self) -> Dict:
+        a = self.args
+        names, weights = list(self.mix), list(self.mix.values())
+        self.controller.transport.connect()
+        t0 = time.monotonic()
+        next_cmd = next_sample = t0
+        interval = 1.0 / a.rate if a.rate > 0 else float("inf")
+        while True:
+            now = time.monotonic()
+            if now - t0 >= a.duration_s:
+                break
+            while next_cmd <= now:
+                cmd = random.choices(names, weights)[0]
+                self.controller.execute(cmd, PARAMS.get(cmd, dict)(), requested_by="soak")
+                next_cmd += interval
+            self.controller.transport.tick(noise_level=0.1)
+            self.lost += len(self.controller.expire_pending(a.ack_timeout_s))
+            if now >= next_sample:
+                s = self.sample(now - t0)
+                next_sample += a.sample_s
+                if not a.quiet:
+                    print(json.dumps(s), flush=True)
+            time.sleep(a.tick_ms / 1000.0)
+        self.sample(time.monotonic() - t0)
+        self.controller.transport.disconnect()
+        if self.recorder:
+            self.recorder.close()
+        return self.report()
+
+    def report(self) -> Dict:
+        a = self.args
+        # Ignore the warm-up share of samples when fitting growth
+        steady = self.samples[int(len(self.samples) * a.warmup_frac):] or self.samples
+        ts = [s["t_s"] for s in steady]
+        rss_growth = slope_per_hour(ts, [s["rss_mb"] for s in steady]) * a.duration_s / 3600.0
+        obj_growth = slope_per_hour(ts, [s["objects"] for s in steady]) * a.duration_s / 3600.0
+        obj_base = steady[0]["objects"] or 1
+        p99s = [s["ack_p99_ms"] for s in steady if s["ack_p99_ms"] is not None]
+        late_p99 = p99s[-1] if p99s else None
+        checks = {
+            "rss_growth_mb": (round(rss_growth, 2), a.max_rss_growth_mb),
+            "object_growth_pct": (round(100.0 * obj_growth / obj_base, 2), a.max_object_growth_pct),
+            "max_pending_actions": (max(s["pending_actions"] for s in self.samples), a.max_pending),
+            "final_ack_p99_ms": (late_p99, a.max_p99_ms),
+        }
+        failures = [k for k, (v, limit) in checks.items() if v is not None and limit is not None and v > limit]
+        return {
+            "config": vars(a),
+            "summary": {k: {"value": v, "limit": limit} for k, (v, limit) in checks.items()},
+            "passed": not failures,
+            "failures": failures,
+            "samples": self.samples,
+        }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--transport", default="sim", help="registry name: sim | mqtt | ws | replay")
+    ap.add_argument("--device-id", default=os.getenv("PIXKIT_DEVICE_ID", "pixkit-soak"))
+    ap.add_argument("--duration-s", type=float, default=60.0)
+    ap.add_argument("--rate", type=float, default=10.0, help="commands per second")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="weighted command mix, e.g. set_controls=5,set_aux=1")
+    ap.add_argument("--tick-ms", type=float, default=50.0)
+    ap.add_argument("--sample-s", type=float, default=5.0)
+    ap.add_argument("--buffer", type=int, default=1000, help="telemetry buffer length kept by the consumer")
+    ap.add_argument("--min-latency-ms", type=int, default=50)
+    ap.add_argument("--max-latency-ms", type=int, default=300)
+    ap.add_argument("--failure-rate", type=float, default=0.02)
+    ap.add_argument("--ack-timeout-s", type=float, default=30.0)
+    ap.add_argument("--warmup-frac", type=float, default=0.2)
+    ap.add_argument("--max-rss-growth-mb", type=float, default=20.0)
+    ap.add_argument("--max-object-growth-pct", type=float, default=10.0)
+    ap.add_argument("--max-pending", type=int, default=1000)
+    ap.add_argument("--max-p99-ms", type=float, default=None)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--report", default="soak_report.json")
+    ap.add_argument("--record", default=os.getenv("PIXKIT_RECORD_PATH") or None,
+                    help="append received telemetry/acks to this Recorder log")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    report = Soak(args).run()
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({"passed": report["passed"], "failures": report["failures"], **report["summary"]}, indent=2))
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
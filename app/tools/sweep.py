@@ -0,0 +1,198 @@
+"""
+Monte Carlo parameter sweep over headless Car/SimTransport scenarios.
+
+Every combination of the grid values (x --repeats seeds) is one scenario: the car is
+started, driven by a throttle profile with a set_controls command every
+--command-interval-s, and stepped on a virtual clock (--tick-s per physics step; the
+Car model scales speed response, drain, heat and motion by the step length, so
+results do not depend on --tick-s beyond integration error) until the battery is
+empty or --max-hours have elapsed. Commands still unacked at the end are drained for
+up to --ack-timeout-s before being counted as lost. Between physics steps the
+clock jumps straight to each pending ack/delivery (SimTransport.next_due), so ack
+latencies are exact rather than tick-quantized, and nothing sleeps: a scenario
+costs only CPU; scenarios run in a process pool across all cores and one row per
+scenario is written to a columnar file (.parquet via pyarrow, or .csv).
+
+    python -m tools.sweep --modes eco,cruise,sport --profiles constant,stop_go \\
+        --throttle 0.3,0.6,1.0 --latency 50-300,200-1500 --failure-rate 0,0.05 \\
+        --repeats 10 --out sweep.parquet
+"""
+import argparse, itertools, os, random, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+PROFILES = {
+    "constant": lambda t, rng: 1.0,
+    "stop_go": lambda t, rng: 1.0 if int(t // 60) % 2 == 0 else 0.0,  # 1 min drive / 1 min stopped
+    "ramp": lambda t, rng: (t % 600.0) / 600.0,                          # 10 min sawtooth
+    "random": lambda t, rng: rng.random(),
+}
+
+
+class VirtualClock:
+    """Callable clock for SimTransport(clock=...); time only moves when `t` is set."""
+
+    def __init__(self, start: float = 0.0):
+        self.t = start
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def parse_list(spec: str, cast=str) -> List:
+    return [cast(v.strip()) for v in spec.split(",") if v.strip()]
+
+
+def parse_latency(spec: str) -> List[tuple]:
+    out = []
+    for part in parse_list(spec):
+        lo, _, hi = part.partition("-")
+        out.append((int(lo), int(hi or lo)))
+    return out
+
+
+def build_grid(args) -> List[Dict]:
+    grid = itertools.product(
+        parse_list(args.modes), parse_list(args.profiles), parse_list(args.throttle, float),
+        parse_list(args.noise, float), parse_latency(args.latency), parse_list(args.failure_rate, float),
+        parse_list(args.network), range(args.repeats),
+    )
+    scenarios = []
+    for i, (mode, profile, throttle, noise, (lo, hi), fail, network, rep) in enumerate(grid):
+        scenarios.append({
+            "scenario": i, "mode": mode, "profile": profile, "throttle": throttle, "noise": noise,
+            "min_latency_ms": lo, "max_latency_ms": hi, "failure_rate": fail, "network": network,
+            "seed": args.seed + i, "repeat": rep,
+            "tick_s": args.tick_s, "command_interval_s": args.command_interval_s,
+            "max_hours": args.max_hours, "ack_timeout_s": args.ack_timeout_s,
+        })
+    return scenarios
+
+
+def run_scenario(scn: Dict) -> Dict:
+    """Run one scenario to completion under a virtual clock and return its result row."""
+    import numpy as np
+    from pixkit_transports.sim import MockPolicy, SimTransport
+    from services.controller import PixkitController
+    from services.fleet_index import distance_m
+
+    random.seed(scn["seed"])  # Car noise/heading and MockPolicy draws use the module RNG
+    rng = random.Random(scn["seed"])
+    clock = VirtualClock()
+    sent, latencies = {}, []
+
+    def on_ack(ack):
+        corr = ack.get("correlation_id")
+        if corr in sent:
+            latencies.append((clock() - sent.pop(corr)) * 1000.0)
+            ctrl.clear_action(corr)
+
+    transport = SimTransport(f"sweep-{scn['scenario']}", on_telemetry=lambda _: None, on_ack=on_ack, clock=clock)
+    transport.set_policy(MockPolicy(scn["min_latency_ms"], scn["max_latency_ms"], scn["failure_rate"]))
+    ctrl = PixkitController(transport)
+    if scn["network"] != "off":
+        ctrl.set_network_model(scn["network"], scn["seed"])
+
+    def send(command, params):
+        sent[ctrl.execute(command, params, requested_by="sweep")] = clock()
+
+    car, profile = transport.car, PROFILES[scn["profile"]]
+    tick_s, limit_s = scn["tick_s"], scn["max_hours"] * 3600.0
+    send("start", {})
+    next_cmd, distance, depleted_at = 0.0, 0.0, None
+    while clock() < limit_s:
+        if clock() >= next_cmd:
+            throttle = round(scn["throttle"] * profile(clock(), rng), 3)
+            send("set_controls", {"mode": scn["mode"], "throttle": throttle, "steering": 0.0})
+            next_cmd += scn["command_interval_s"]
+        lat, lon = car.gps["lat"], car.gps["lon"]
+        transport.tick(noise_level=scn["noise"], dt=tick_s)
+        distance += distance_m(lat, lon, car.gps["lat"], car.gps["lon"])
+        next_tick = clock() + tick_s
+        due = transport.next_due()
+        while due is not None and due < next_tick:
+            clock.t = max(clock.t, due)
+            transport.pump()
+            due = transport.next_due()
+        clock.t = next_tick
+        if car.battery_pct <= 0.0:
+            depleted_at = clock()
+            break
+
+    elapsed_h = clock() / 3600.0
+    # Let in-flight commands finish (no physics) so only real losses count as lost
+    unacked, horizon = len(sent), clock() + scn["ack_timeout_s"]
+    due = transport.next_due()
+    while sent and due is not None and due <= horizon:
+        clock.t = max(clock.t, due)
+        transport.pump()
+        due = transport.next_due()
+    used = 100.0 - car.battery_pct
+    lat_ms = np.asarray(latencies) if latencies else np.asarray([np.nan])
+    p50, p95, p99 = np.percentile(lat_ms, [50, 95, 99])
+    return {
+        **scn,
+        "depleted": depleted_at is not None,
+        "battery_life_h": elapsed_h if depleted_at is not None else (elapsed_h * 100.0 / used if used > 0 else np.inf),
+        "battery_end_pct": round(car.battery_pct, 3),
+        "elapsed_h": elapsed_h,
+        "distance_km": distance / 1000.0,
+        "commands": len(latencies) + len(sent),
+        "acks": len(latencies),
+        "unacked_at_end": unacked,
+        "lost_acks": len(sent),  # still unacked after draining (lost on the network)
+        "ack_p50_ms": p50, "ack_p95_ms": p95, "ack_p99_ms": p99,
+        "ack_max_ms": float(np.max(lat_ms)),
+        "ack_timeouts": int(np.sum(lat_ms > scn["ack_timeout_s"] * 1000.0)) + len(sent),
+    }
+
+
+def write_results(rows: List[Dict], path: str) -> None:
+    import pandas as pd
+    df = pd.DataFrame(rows).sort_values("scenario")
+    if path.endswith(".csv"):
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--modes", default="eco,manual,cruise,sport")
+    ap.add_argument("--profiles", default="constant,stop_go", help=f"comma list of {','.join(PROFILES)}")
+    ap.add_argument("--throttle", default="0.5,1.0", help="throttle levels the profile is scaled by")
+    ap.add_argument("--noise", default="0.1")
+    ap.add_argument("--latency", default="100-800", help="MockPolicy latency ranges, e.g. 50-300,100-800")
+    ap.add_argument("--failure-rate", default="0.0")
+    ap.add_argument("--network", default="off", help="netem presets (off | lan | wifi | lte | degraded_cellular)")
+    ap.add_argument("--repeats", type=int, default=1, help="seeds per grid point")
+    ap.add_argument("--seed", type=int, default=0, help="base seed; scenario i uses seed + i")
+    ap.add_argument("--tick-s", type=float, default=1.0, help="virtual seconds per physics step")
+    ap.add_argument("--command-interval-s", type=float, default=5.0)
+    ap.add_argument("--max-hours", type=float, default=12.0)
+    ap.add_argument("--ack-timeout-s", type=float, default=30.0, help="counts acks slower than this as timeouts")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--out", default="sweep.parquet", help=".parquet (pyarrow) or .csv")
+    args = ap.parse_args(argv)
+
+    unknown = set(parse_list(args.profiles)) - set(PROFILES)
+    if unknown:
+        ap.error(f"unknown profile(s): {', '.join(sorted(unknown))}")
+    scenarios = build_grid(args)
+    print(f"{len(scenarios)} scenarios on {args.workers} workers", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    rows = []
+    chunksize = max(1, len(scenarios) // (args.workers * 8))
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for n, row in enumerate(pool.map(run_scenario, scenarios, chunksize=chunksize), 1):
+            rows.append(row)
+            if n % max(1, len(scenarios) // 20) == 0:
+                print(f"  {n}/{len(scenarios)}  {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    write_results(rows, args.out)
+    print(f"wrote {len(rows)} rows to {args.out} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())